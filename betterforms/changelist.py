@@ -1,14 +1,20 @@
 import copy
+import datetime
+import json
+from operator import and_, or_
 
 from django import forms
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
 from django.forms.utils import pretty_name
-from django.core.exceptions import ValidationError, ImproperlyConfigured
-from django.db.models import Q
+from django.core.exceptions import FieldDoesNotExist, ValidationError, ImproperlyConfigured
+from django.db.models import Model, Q
 from collections import OrderedDict
 from functools import reduce
 from django.utils.http import urlencode
 
 from .forms import BetterForm
+from .search import ContainsSearchBackend, parse_search_field, parse_search_query
 
 
 def construct_querystring(data, **kwargs):
@@ -24,6 +30,153 @@ def construct_querystring(data, **kwargs):
         return urlencode(params)
 
 
+def split_querystring(data, key):
+    """
+    Encodes ``data`` exactly like ``construct_querystring`` would, leaving out
+    ``key``.  Returns a two-tuple of the encoded parameters that come before
+    and after ``key``, so that ``key`` can be re-encoded with different values
+    without encoding the rest of ``data`` again.
+    """
+    pairs = construct_querystring(data, **{key: ''}).split('&')
+    index = pairs.index(urlencode({key: ''}))
+    return '&'.join(pairs[:index]), '&'.join(pairs[index + 1:])
+
+
+class CursorJSONEncoder(DjangoJSONEncoder):
+    """
+    ``DjangoJSONEncoder`` truncates datetimes and times to milliseconds, and
+    a truncated cursor value would match the last row of the previous page
+    again.  Keep the microseconds.
+    """
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class CursorSerializer:
+    """
+    JSON serializer for the signed keyset cursors, which also handles dates,
+    decimals and UUIDs.
+    """
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(',', ':'), cls=CursorJSONEncoder).encode('latin-1')
+
+    def loads(self, data):
+        return json.loads(data.decode('latin-1'))
+
+
+def keyset_filter(ordering, values):
+    """
+    Returns a ``Q`` matching the rows that come after ``values`` in
+    ``ordering``, a list of ``(column_name, is_descending)`` two-tuples.  This
+    is the expanded form of ``WHERE (col1, col2) > (value1, value2)``, which
+    also supports mixed sort directions.
+    """
+    conditions = []
+    equal = {}
+    for (column_name, is_descending), value in zip(ordering, values):
+        lookup = '{0}__{1}'.format(column_name, 'lt' if is_descending else 'gt')
+        conditions.append(Q(**dict(equal, **{lookup: value})))
+        equal[column_name] = value
+    return reduce(or_, conditions)
+
+
+def expand_keyset_column(model, column_name, is_descending, seen=()):
+    """
+    Returns the ``(column_name, is_descending)`` two-tuples that ``order_by``
+    sorts by for ``column_name``.  A relation is sorted by the
+    ``Meta.ordering`` of the related model, so it is expanded into the
+    columns of that ordering, whose values are read through the relation.  A
+    relation without an ordering is sorted by its foreign key.
+    """
+    parts = column_name.split('__')
+    opts = model._meta
+    for index, part in enumerate(parts):
+        if part == 'pk':
+            break
+        try:
+            field = opts.get_field(part)
+        except FieldDoesNotExist:
+            break
+        if not field.is_relation:
+            break
+        opts = field.related_model._meta
+        if index < len(parts) - 1 or part == field.attname:
+            continue
+        if not opts.ordering:
+            if (field.many_to_one or field.one_to_one) and field.concrete:
+                parts[index] = field.attname
+            break
+        if opts.model in seen:
+            raise ImproperlyConfigured('Infinite loop caused by the ordering of `{0}`.'.format(opts.label))
+        ordering = []
+        for item in opts.ordering:
+            if not isinstance(item, str) or item == '?':
+                raise ImproperlyConfigured(
+                    'Keyset pagination can\'t sort `{0}` by the ordering of `{1}`.'.format(column_name, opts.label)
+                )
+            ordering.extend(expand_keyset_column(
+                model, '{0}__{1}'.format(column_name, item.lstrip('-')),
+                is_descending != item.startswith('-'), seen + (opts.model,),
+            ))
+        return ordering
+    return [('__'.join(parts), is_descending)]
+
+
+def get_column_value(obj, column_name):
+    """
+    Follows a ``__`` separated column name from ``obj``, the way ``order_by``
+    follows it in the database.
+    """
+    for attname in column_name.split('__'):
+        if obj is None:
+            return None
+        obj = getattr(obj, attname)
+    if isinstance(obj, Model):
+        return obj.pk
+    return obj
+
+
+class KeysetPage:
+    """
+    A page of results from keyset pagination.  Mirrors the parts of Django's
+    ``Page`` that make sense without an offset.
+    """
+    def __init__(self, form, object_list, next_cursor, is_first):
+        self.form = form
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.is_first = is_first
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return not self.is_first
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_querystring(self):
+        if self.next_cursor is not None:
+            return self.form.get_cursor_querystring(self.next_cursor)
+
+    @property
+    def first_querystring(self):
+        return self.form.get_cursor_querystring(None)
+
+
 class IterDict(OrderedDict):
     """
     Extension of djangos built in sorted dictionary class which iterates
@@ -65,10 +218,13 @@ class BaseChangeListForm(BetterForm):
 class SearchForm(BaseChangeListForm):
     SEARCH_FIELDS = None
     CASE_SENSITIVE = False
+    SEARCH_BACKEND = ContainsSearchBackend()
+    TOKENIZE_QUERY = False
     q = forms.CharField(label="Search", required=False)
 
     def __init__(self, *args, **kwargs):
         self.SEARCH_FIELDS = kwargs.pop('search_fields', self.SEARCH_FIELDS)
+        self.SEARCH_BACKEND = kwargs.pop('search_backend', self.SEARCH_BACKEND)
         super().__init__(*args, **kwargs)
 
         if self.SEARCH_FIELDS is None:
@@ -76,37 +232,74 @@ class SearchForm(BaseChangeListForm):
                                        iterable of fields to search over, or have \
                                        a `SEARCH_FIELDS` attribute set on them.')
 
+    def get_search_terms(self, q):
+        """
+        Returns a list of ``(fields, term)`` two-tuples, where each term must
+        be found in at least one of its fields.  Unless ``TOKENIZE_QUERY`` is
+        set, the whole query is the only term.
+        """
+        if not self.TOKENIZE_QUERY:
+            return [(self.SEARCH_FIELDS, q)]
+
+        # Prefixes name the fields without their lookup prefix.
+        search_fields = {parse_search_field(field)[0]: field for field in self.SEARCH_FIELDS}
+        terms = []
+        for field, term, text in parse_search_query(q):
+            if field is None:
+                terms.append((self.SEARCH_FIELDS, term))
+            elif field in search_fields:
+                terms.append(((search_fields[field],), term))
+            else:
+                # Not a field prefix, so the colon is part of the term.
+                terms.append((self.SEARCH_FIELDS, '{0}:{1}'.format(field, term)))
+        return terms
+
     def get_queryset(self):
         """
-        Constructs an '__contains' or '__icontains' filter across all of the
-        fields listed in ``SEARCH_FIELDS``.
+        Filters the queryset with the ``Q`` objects that ``SEARCH_BACKEND``
+        builds for each of the search terms.
         """
         qs = super().get_queryset()
 
         # Do Searching
         q = self.cleaned_data.get('q', '').strip()
-        if q:
-            args = []
-            for field in self.SEARCH_FIELDS:
-                if self.CASE_SENSITIVE:
-                    kwarg = {field + '__contains': q}
-                else:
-                    kwarg = {field + '__icontains': q}
-                args.append(Q(**kwarg))
-            if len(args) > 1:
-                qs = qs.filter(reduce(lambda x, y: x | y, args))
-            elif len(args) == 1:
-                qs = qs.filter(args[0])
+        if q and self.SEARCH_FIELDS:
+            conditions = [
+                self.SEARCH_BACKEND.get_filter(fields, term, self.CASE_SENSITIVE)
+                for fields, term in self.get_search_terms(q)
+            ]
+            qs = qs.filter(reduce(and_, conditions, Q()))
 
         return qs
 
 
+def get_sort_states(sorts):
+    """
+    Maps the 1-indexed position of every header used in ``sorts`` to a
+    ``(priority, is_ascending)`` two-tuple.
+    """
+    states = {}
+    for priority, sort in enumerate(sorts, 1):
+        first_priority, is_ascending = states.get(abs(sort), (priority, False))
+        states[abs(sort)] = (first_priority, is_ascending or sort > 0)
+    return states
+
+
 class BoundHeader:
-    def __init__(self, form, header):
+    __slots__ = ('form', 'header', 'sorts', 'param', '_position', 'sort_states')
+
+    def __init__(self, form, header, index=None, sort_states=None):
+        """
+        ``index`` and ``sort_states`` are provided by the ``HeaderSet`` so that
+        they are only computed once per form.  Otherwise, they are computed
+        from ``form.HEADERS`` and the cleaned sorts when first needed.
+        """
         self.form = form
         self.header = header
         self.sorts = getattr(form, 'cleaned_data', {}).get('sorts', [])
         self.param = "{0}-sorts".format(form.prefix or '').strip('-')
+        self._position = index
+        self.sort_states = sort_states
 
     @property
     def name(self):
@@ -126,7 +319,9 @@ class BoundHeader:
 
     @property
     def _index(self):
-        return self.form.HEADERS.index(self.header)
+        if self._position is None:
+            self._position = self.form.HEADERS.index(self.header)
+        return self._position
 
     @property
     def _sort_index(self):
@@ -136,12 +331,18 @@ class BoundHeader:
         """
         return self._index + 1
 
+    @property
+    def _sort_state(self):
+        if self.sort_states is None:
+            self.sort_states = get_sort_states(self.sorts)
+        return self.sort_states.get(self._sort_index)
+
     @property
     def is_active(self):
         """
         Returns whether this header is currently being used for sorting.
         """
-        return self._sort_index in map(abs, self.sorts)
+        return self._sort_state is not None
 
     @property
     def is_ascending(self):
@@ -149,7 +350,7 @@ class BoundHeader:
         Returns whether this header is currently being used for sorting in
         ascending order.
         """
-        return self.is_active and self._sort_index in self.sorts
+        return self.is_active and self._sort_state[1]
 
     @property
     def is_descending(self):
@@ -157,7 +358,7 @@ class BoundHeader:
         Returns whether this header is currently being used for sorting in
         descending order.
         """
-        return self.is_active and self._sort_index not in self.sorts
+        return self.is_active and not self._sort_state[1]
 
     @property
     def css_classes(self):
@@ -189,11 +390,18 @@ class BoundHeader:
     @property
     def priority(self):
         if self.is_active:
-            return list(map(abs, self.sorts)).index(self._sort_index) + 1
+            return self._sort_state[0]
+
+    def _construct_querystring(self, value):
+        try:
+            get_sort_querystring = self.form.get_sort_querystring
+        except AttributeError:
+            return construct_querystring(self.form.data, **{self.param: value})
+        return get_sort_querystring(self.param, value)
 
     @property
     def querystring(self):
-        return construct_querystring(self.form.data, **{self.param: '.'.join(map(str, self.add_to_sorts()))})
+        return self._construct_querystring('.'.join(map(str, self.add_to_sorts())))
 
     @property
     def singular_querystring(self):
@@ -201,22 +409,21 @@ class BoundHeader:
             value = -1 * self._sort_index
         else:
             value = self._sort_index
-        return construct_querystring(self.form.data, **{self.param: str(value)})
+        return self._construct_querystring(str(value))
 
     @property
     def remove_querystring(self):
-        return construct_querystring(self.form.data, **{self.param: '.'.join(map(str, self.add_to_sorts()[1:]))})
+        return self._construct_querystring('.'.join(map(str, self.add_to_sorts()[1:])))
 
 
 class Header:
+    __slots__ = ('name', 'label', 'column_name', 'is_sortable')
     BoundClass = BoundHeader
-    column_name = None
 
     def __init__(self, name, label=None, column_name=False, is_sortable=True):
         self.name = name
         self.label = label or pretty_name(name)
-        if is_sortable:
-            self.column_name = column_name or name
+        self.column_name = (column_name or name) if is_sortable else None
         self.is_sortable = is_sortable
 
 
@@ -241,6 +448,9 @@ class HeaderSet:
     def __init__(self, form, headers):
         self.form = form
         self.headers = OrderedDict()
+        self.header_list = ()
+        self.positions = {}
+        self._sort_states = None
         if headers is None:
             return
         for header in headers:
@@ -262,19 +472,33 @@ class HeaderSet:
                 raise ImproperlyConfigured('Unknown format in header declaration: `{0}`'.format(repr(header)))
         if not len(self) == len(headers):
             raise ImproperlyConfigured('Header names must be unique')
+        self.header_list = tuple(self.headers.values())
+        self.positions = {name: index for index, name in enumerate(self.headers)}
 
     def __len__(self):
         return len(self.headers)
 
+    def get_sort_states(self):
+        """
+        Returns the sort states of the headers for the form's current sorts,
+        computed once and shared by all of the bound headers.
+        """
+        sorts = getattr(self.form, 'cleaned_data', {}).get('sorts', [])
+        if self._sort_states is None or self._sort_states[0] is not sorts:
+            self._sort_states = (sorts, get_sort_states(sorts))
+        return self._sort_states[1]
+
     def __iter__(self):
-        for header in self.headers.values():
-            yield self.HeaderClass.BoundClass(self.form, header)
+        sort_states = self.get_sort_states()
+        for index, header in enumerate(self.header_list):
+            yield self.HeaderClass.BoundClass(self.form, header, index, sort_states)
 
     def __getitem__(self, key):
         if isinstance(key, int):
-            return self.HeaderClass.BoundClass(self.form, list(self.headers.values())[key])
+            index = range(len(self.header_list))[key]
         else:
-            return self.HeaderClass.BoundClass(self.form, self.headers[key])
+            index = self.positions[key]
+        return self.HeaderClass.BoundClass(self.form, self.header_list[index], index, self.get_sort_states())
 
 
 class SortFormBase(BetterForm):
@@ -305,9 +529,109 @@ class SortFormBase(BetterForm):
     HEADERS = None
     sorts = forms.CharField(required=False, widget=forms.HiddenInput())
 
+    cursor_salt = 'betterforms.changelist.cursor'
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.headers = self.HeaderSetClass(self, self.HEADERS)
+        self.cursor_param = "{0}-cursor".format(self.prefix or '').strip('-')
+        self._querystring_parts = {}
+
+    def get_sort_querystring(self, param, value):
+        """
+        Returns the querystring for ``self.data`` with the ``param`` parameter
+        set to ``value``, or removed if ``value`` is ``None``.  The rest of
+        ``self.data`` is only encoded once per form and shared between all of
+        the header querystrings.  Changing the sorts drops the keyset cursor.
+        """
+        try:
+            before, after = self._querystring_parts[param]
+        except KeyError:
+            data = self.data
+            if param != self.cursor_param and self.cursor_param in data:
+                data = data.copy()
+                del data[self.cursor_param]
+            before, after = self._querystring_parts[param] = split_querystring(data, param)
+        encoded = urlencode({param: value}) if value is not None else ''
+        return '&'.join(part for part in (before, encoded, after) if part)
+
+    def get_cursor_querystring(self, cursor):
+        """
+        Returns the querystring for the keyset page starting after ``cursor``,
+        or for the first page if ``cursor`` is ``None``.
+        """
+        return self.get_sort_querystring(self.cursor_param, cursor)
+
+    def get_keyset_ordering(self, queryset):
+        """
+        Returns the ordering used for keyset pagination as a list of
+        ``(column_name, is_descending)`` two-tuples.  It is made of the active
+        sorts, or the ordering of ``queryset`` if there aren't any, followed by
+        the primary key to break ties.  Relations are expanded into the
+        ordering of the related model, like ``order_by`` does.
+        """
+        order_by = self.get_order_by()
+        if not order_by:
+            order_by = [
+                column for column in (queryset.query.order_by or queryset.model._meta.ordering)
+                if isinstance(column, str) and column != '?'
+            ]
+        ordering = []
+        for column in order_by:
+            ordering.extend(expand_keyset_column(queryset.model, column.lstrip('-'), column.startswith('-')))
+        pk = queryset.model._meta.pk
+        pk_names = ('pk', pk.name, pk.attname)
+        if not any(column_name in pk_names for column_name, is_descending in ordering):
+            ordering.append(('pk', False))
+        return ordering
+
+    def encode_cursor(self, values):
+        """
+        Returns an opaque, signed token for the position after ``values``.
+        The current sorts are part of the token.
+        """
+        sorts = self.cleaned_data.get('sorts', [])
+        return signing.dumps(
+            [sorts, list(values)], salt=self.cursor_salt,
+            serializer=CursorSerializer, compress=True,
+        )
+
+    def decode_cursor(self, cursor):
+        """
+        Returns the values stored in a cursor token, or ``None`` if the token
+        was made for other sorts.  Raises ``django.core.signing.BadSignature``
+        for tampered tokens.
+        """
+        sorts, values = signing.loads(cursor, salt=self.cursor_salt, serializer=CursorSerializer)
+        if sorts != self.cleaned_data.get('sorts', []):
+            return None
+        return values
+
+    def get_keyset_page(self, queryset, page_size):
+        """
+        Returns a ``KeysetPage`` of ``page_size`` rows of ``queryset``, after
+        the cursor submitted in the form data.  The rows are found with a
+        ``WHERE`` on the sort columns instead of an ``OFFSET``, so every page
+        costs the same.  The sort columns must not contain ``NULL`` values.
+        """
+        ordering = self.get_keyset_ordering(queryset)
+        queryset = queryset.order_by(*(
+            '-' + column_name if is_descending else column_name
+            for column_name, is_descending in ordering
+        ))
+        cursor = self.data.get(self.cursor_param)
+        values = self.decode_cursor(cursor) if cursor else None
+        if values is not None:
+            queryset = queryset.filter(keyset_filter(ordering, values))
+        object_list = list(queryset[:page_size + 1])
+        next_cursor = None
+        if len(object_list) > page_size:
+            object_list = object_list[:page_size]
+            next_cursor = self.encode_cursor(
+                get_column_value(object_list[-1], column_name)
+                for column_name, is_descending in ordering
+            )
+        return KeysetPage(self, object_list, next_cursor, values is None)
 
     def clean_sorts(self):
         cleaned_data = self.cleaned_data
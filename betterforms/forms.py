@@ -1,20 +1,119 @@
+import hashlib
+import os
+import re
+import time
+
 try:
     from collections.abc import Iterable
 except AttributeError:
     # BBB Python < 3.9
     from collections import Iterable
 from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from types import MappingProxyType
 
 from django import forms
+from django.forms.boundfield import BoundField
 from django.forms.utils import ErrorDict
-from django.core.exceptions import NON_FIELD_ERRORS
-from django.template.loader import render_to_string
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.exceptions import NON_FIELD_ERRORS, EmptyResultSet
+from django.core.signals import setting_changed
+from django.db.models import Model, QuerySet
+from django.dispatch import receiver
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template, render_to_string
+from django.utils.html import conditional_escape, format_html
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+from betterforms.signals import fieldset_rendered, form_rendered
+from betterforms.templatetags.betterforms_tags import is_checkbox
+
+
+PACKAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '')
+
+packaged_templates = {}
+
+# The templates reproduced by the render plan, with the templates they extend.
+FIELDSET_TEMPLATE_NAMES = ('betterforms/fieldset_as_div.html',)
+AS_P_TEMPLATE_NAMES = (
+    'betterforms/form_as_p.html', 'betterforms/form_as_fieldsets.html',
+    'betterforms/fieldset_as_p.html', 'betterforms/fieldset_as_div.html',
+)
+
+
+def is_packaged_template(template_name, using=None):
+    """
+    Returns whether ``template_name`` resolves to the template shipped with
+    betterforms rather than to a project override.  The render plan
+    reproduces the shipped templates, so it can't be used for overrides.
+    The answer is cached until the ``TEMPLATES`` setting changes.
+    """
+    key = (template_name, using)
+    try:
+        return packaged_templates[key]
+    except KeyError:
+        pass
+    try:
+        origin = get_template(template_name, using=using).origin.name
+    except TemplateDoesNotExist:
+        result = False
+    else:
+        result = os.path.abspath(origin).startswith(PACKAGE_DIR)
+    packaged_templates[key] = result
+    return result
+
+
+@receiver(setting_changed)
+def clear_packaged_templates(setting, **kwargs):
+    if setting == 'TEMPLATES':
+        packaged_templates.clear()
+
+
+def get_value_fingerprint(value):
+    """
+    Returns a representation of ``value`` for the render cache key.
+    Querysets are represented by their SQL and parameters, so that they
+    aren't evaluated.
+    """
+    if isinstance(value, QuerySet):
+        try:
+            sql, params = value.query.sql_with_params()
+            return ('queryset', value.db, sql, repr(params))
+        except EmptyResultSet:
+            return ('queryset', None)
+    if isinstance(value, Model):
+        return ('model', value._meta.label, value.pk)
+    if isinstance(value, (list, tuple)):
+        return tuple(get_value_fingerprint(item) for item in value)
+    return repr(value)
+
+
+def get_field_fingerprint(field):
+    """
+    Returns a representation of the parts of ``field`` that change its
+    render, for the render cache key.
+    """
+    if hasattr(field, 'queryset'):
+        choices = get_value_fingerprint(field.queryset)
+    elif hasattr(field, 'choices'):
+        choices = repr(list(field.choices))
+    else:
+        choices = None
+    widget = field.widget
+    return (
+        type(field).__qualname__, field.required, field.disabled, str(field.label),
+        str(field.help_text), get_value_fingerprint(field.initial), choices,
+        type(widget).__qualname__, sorted((str(key), repr(value)) for key, value in widget.attrs.items()),
+    )
 
 
 class CSSClassMixin:
     """
     Sane defaults for error and css classes.
     """
+    __slots__ = ()
     error_css_class = 'error'
     required_css_class = 'required'
 
@@ -51,6 +150,11 @@ class LabelSuffixMixin:
         super().__init__(*args, **kwargs)
 
 
+# Set while the rows of a fieldset are processed, so that the fieldsets nested
+# in them know that the root fieldset indexes and checks the whole tree.
+building_fieldset = ContextVar('betterforms_building_fieldset', default=False)
+
+
 def process_fieldset_row(fields, fieldset_class, base_name):
     for index, row in enumerate(fields):
         if not isinstance(row, (str, Fieldset)):
@@ -66,33 +170,400 @@ def flatten(elements):
     Flattens a mixed list of strings and iterables of strings into a single
     iterable of strings.
     """
-    for element in elements:
-        if isinstance(element, Iterable) and not isinstance(element, str):
-            for sub_element in flatten(element):
-                yield sub_element
-        else:
+    # Walk the tree with an explicit stack of iterators rather than recursing,
+    # so deep trees neither re-yield through every level nor hit the
+    # recursion limit.
+    stack = [iter(elements)]
+    while stack:
+        for element in stack[-1]:
+            if isinstance(element, Iterable) and not isinstance(element, str):
+                stack.append(iter(element))
+                break
             yield element
+        else:
+            stack.pop()
 
 
 flatten_to_tuple = lambda x: tuple(flatten(x))
 
 
+FIELDSET_START = 'fieldset_start'
+FIELDSET_END = 'fieldset_end'
+FIELD = 'field'
+
+
+def compile_render_plan(fieldset):
+    """
+    Compiles the rows of a fieldset into a flat tuple of ``(step, node)``
+    pairs, where ``node`` is a field name for ``FIELD`` steps and a
+    ``Fieldset`` for ``FIELDSET_START`` and ``FIELDSET_END`` steps.  Returns
+    ``None`` if a nested fieldset has a custom ``template_name``, in which case
+    the tree has to be rendered by the templates.
+    """
+    steps = []
+    for row in fieldset:
+        if isinstance(row, str):
+            steps.append((FIELD, row))
+            continue
+        if row.template_name:
+            return None
+        nested = row.render_plan
+        if nested is None:
+            return None
+        steps.append((FIELDSET_START, row))
+        steps.extend(nested)
+        steps.append((FIELDSET_END, row))
+    return tuple(steps)
+
+
+def iter_render_plan(bound_fieldset, steps, field_template_name, renderer=None):
+    """
+    Renders the steps of a compiled render plan in a single linear pass,
+    yielding the HTML of each step.  Nested fieldsets are looked up on
+    ``bound_fieldset`` so that the form's bound fieldset tree is reused.  If a
+    ``renderer`` is given, its ``render_field`` and ``render_fieldset_start``
+    methods are used instead of the field template.
+    """
+    form = bound_fieldset.form
+    if renderer is None:
+        field_template = get_template(field_template_name, using=form.template_engine)
+        render_field = lambda field: field_template.render({'field': field})
+        render_start = lambda fieldset: fieldset.render_start()
+        include = 1
+    else:
+        render_field = renderer.render_field
+        render_start = renderer.render_fieldset_start
+        include = 0
+    send_fieldset_rendered = fieldset_rendered.has_listeners(type(form))
+    fields = includes = 0
+    # The bound fieldsets, with their start time and counters if the
+    # ``fieldset_rendered`` signal has to be sent.
+    stack = [(bound_fieldset, None)]
+    for step, node in steps:
+        if step == FIELD:
+            fields += 1
+            includes += include
+            yield render_field(form[node])
+        elif step == FIELDSET_START:
+            fieldset = stack[-1][0][node.name]
+            started = (time.perf_counter(), fields, includes) if send_fieldset_rendered else None
+            stack.append((fieldset, started))
+            yield render_start(fieldset)
+        else:
+            fieldset, started = stack.pop()
+            if started is not None:
+                fieldset_rendered.send(
+                    sender=type(form), form=form, fieldset=fieldset,
+                    duration=time.perf_counter() - started[0],
+                    fields=fields - started[1], includes=includes - started[2],
+                )
+            yield '</fieldset>'
+    stats = current_render_stats.get()
+    if stats is not None:
+        stats.fields += fields
+        stats.includes += includes
+
+
+class RenderStats:
+    """
+    Counts the bound fields and the templates rendered while a form or a
+    fieldset is instrumented.
+    """
+    __slots__ = ('fields', 'includes')
+
+    def __init__(self):
+        self.fields = 0
+        self.includes = 0
+
+    def count(self, item):
+        # Every item of a fieldset is included by the fieldset template.
+        self.includes += 1
+        if not getattr(item, 'is_fieldset', False):
+            self.fields += 1
+
+
+current_render_stats = ContextVar('betterforms_render_stats', default=None)
+
+
+def render_instrumented(signal, render, form, **kwargs):
+    """
+    Returns ``render()``.  If ``signal`` has receivers for the form class, it
+    is sent with the render time and the number of fields and templates
+    rendered.
+    """
+    sender = type(form)
+    if not signal.has_listeners(sender):
+        return render()
+    parent = current_render_stats.get()
+    stats = RenderStats()
+    token = current_render_stats.set(stats)
+    start = time.perf_counter()
+    try:
+        html = render()
+    finally:
+        current_render_stats.reset(token)
+    duration = time.perf_counter() - start
+    if parent is not None:
+        parent.fields += stats.fields
+        parent.includes += stats.includes
+    signal.send(
+        sender=sender, form=form, duration=duration,
+        fields=stats.fields, includes=stats.includes, **kwargs
+    )
+    return html
+
+
+WIDGET_MARKER = '\x00betterforms-widget\x00'
+ERRORS_MARKER = '\x00betterforms-errors\x00'
+MARKERS_RE = re.compile('({0}|{1})'.format(WIDGET_MARKER, ERRORS_MARKER))
+
+
+def render_field_as_p(field):
+    """
+    Renders ``field`` the same way ``betterforms/field_as_p.html`` does.
+    """
+    if field.is_hidden:
+        return format_html('\n  {0}\n\n', field)
+    css_classes = field.css_classes()
+    if css_classes:
+        html = [format_html('\n<p class="{0}">', css_classes)]
+    else:
+        html = ['\n<p>']
+    html.append(format_html('\n    {0}\n    {1}\n    {2}\n    ', field.errors, field.label_tag(), field))
+    if field.help_text:
+        html.append(format_html('\n      <span class="helptext">{0}</span>\n    ', field.help_text))
+    html.append('\n  </p>\n\n')
+    return mark_safe(''.join(html))
+
+
+def render_field_as_div(field):
+    """
+    Renders ``field`` the same way ``betterforms/field_as_div.html`` does.
+    """
+    if field.is_hidden:
+        return format_html('\n\n  {0}\n\n', field)
+    css_classes = field.css_classes()
+    classes = [css_classes + ' ' if css_classes else '', field.html_name]
+    if field.form.prefix:
+        classes.append(' ' + field.name)
+    classes.append(' formField')
+    if field.field.required and not field.form.required_css_class:
+        classes.append(' required')
+    html = [format_html('\n\n<div class="{0}">\n  ', ''.join(classes))]
+    checkbox = is_checkbox(field)
+    if not checkbox:
+        html.append(format_html('\n    {0}\n  ', field.label_tag()))
+    html.append('\n\n  ')
+    if field.help_text:
+        html.append(format_html('\n    <p class="help_text">{0}</p>\n  ', mark_safe(field.help_text)))
+    html.append(format_html('\n\n  {0}\n  ', field))
+    if checkbox:
+        html.append(format_html('\n    {0}\n  ', field.label_tag()))
+    html.append(format_html('\n  {0}\n</div>\n\n', field.errors))
+    return mark_safe(''.join(html))
+
+
+class NativeRenderer:
+    """
+    Renders the fields and fieldsets of a render plan in Python, with the same
+    markup as the shipped templates and without going through the template
+    engine.
+    """
+    field_renderers = {
+        'betterforms/field_as_p.html': render_field_as_p,
+        'betterforms/field_as_div.html': render_field_as_div,
+    }
+
+    def __init__(self, field_template_name):
+        self.render_field = self.field_renderers[field_template_name]
+
+    def render_fieldset_start(self, bound_fieldset):
+        return bound_fieldset.render_start()
+
+
+class StaticBoundField:
+    """
+    Stands in for a bound field while its field template is pre-rendered.  The
+    widget and the errors render as markers which split the output into
+    static fragments, everything else comes from the real bound field.
+    """
+    def __init__(self, bound_field, has_errors):
+        self.bound_field = bound_field
+        self.errors = mark_safe(ERRORS_MARKER) if has_errors else ''
+
+    def __getattr__(self, name):
+        return getattr(self.bound_field, name)
+
+    def __str__(self):
+        return mark_safe(WIDGET_MARKER)
+
+    __html__ = __str__
+
+    def css_classes(self, extra_classes=None):
+        return BoundField.css_classes(self, extra_classes)
+
+
+class StaticFragments:
+    """
+    The static fragments of the fields and fieldsets of a form class, for one
+    language, prefix and field template.  Each field and fieldset is
+    pre-rendered once for its clean state and once for its error state, only
+    the widgets and the errors are rendered for every request.
+    """
+    def __init__(self, field_template_name, using=None):
+        self.field_template = get_template(field_template_name, using=using)
+        self.fields = {}
+        self.fieldsets = {}
+
+    def compile_field(self, bound_field, has_errors):
+        html = self.field_template.render({'field': StaticBoundField(bound_field, has_errors)})
+        return tuple(MARKERS_RE.split(html))
+
+    def render_field(self, bound_field):
+        errors = bound_field.errors
+        key = (bound_field.name, bool(errors))
+        try:
+            fragments = self.fields[key]
+        except KeyError:
+            fragments = self.fields[key] = self.compile_field(bound_field, bool(errors))
+        html = []
+        for fragment in fragments:
+            if fragment == WIDGET_MARKER:
+                fragment = conditional_escape(bound_field)
+            elif fragment == ERRORS_MARKER:
+                fragment = conditional_escape(errors)
+            html.append(fragment)
+        return mark_safe(''.join(html))
+
+    def render_fieldset_start(self, bound_fieldset):
+        errors = bound_fieldset.errors
+        key = (bound_fieldset.name, bool(errors))
+        try:
+            chrome = self.fieldsets[key]
+        except KeyError:
+            css_classes = bound_fieldset.get_css_classes(bool(errors))
+            chrome = self.fieldsets[key] = bound_fieldset.render_chrome(css_classes)
+        return chrome + conditional_escape(errors)
+
+
 class Fieldset(CSSClassMixin):
+    """
+    Fieldsets use ``__slots__`` because large forms build many of them.  The
+    keyword arguments must be declared attributes: ``legend``, ``css_classes``,
+    ``template_name``, or an extra attribute declared in the ``__slots__`` of a
+    subclass.  Unset attributes fall back to ``attribute_defaults``.
+    """
+    __slots__ = (
+        'name', 'base_fields', 'fields', '_paths', 'fieldset_names',
+        'legend', 'css_classes', 'template_name', '_render_plan', '_frozen',
+    )
     FIELDSET_CSS_CLASS = 'formFieldset'
-    css_classes = None
-    template_name = None
+    attribute_defaults = {
+        'css_classes': None,
+        'template_name': None,
+    }
+    # The attributes describing the structure of the fieldset can't be
+    # changed after construction because they are precomputed.
+    frozen_attributes = ('name', 'base_fields', 'fields', 'paths', '_paths', 'fieldset_names')
 
     def __init__(self, name, fields=[], **kwargs):
         self.name = name
-        self.base_fields = tuple(process_fieldset_row(fields, type(self), name))
+        is_nested = building_fieldset.get()
+        token = building_fieldset.set(True)
+        try:
+            self.base_fields = tuple(process_fieldset_row(fields, type(self), name))
+        finally:
+            building_fieldset.reset(token)
         self.legend = kwargs.pop("legend", None)
-        # Check for duplicate names.
-        names = [str(thing) for thing in self.base_fields]
-        duplicates = [x for x, y in Counter(names).items() if y > 1]
-        if duplicates:
-            raise AttributeError('Name Conflict in fieldset `{0}`.  The name(s) `{1}` appear multiple times.'.format(self.name, duplicates))
+        if not is_nested:
+            self._index()
+        declared = self.get_declared_attributes()
         for key, value in kwargs.items():
+            if key not in declared:
+                raise TypeError('Fieldset `{0}` got an unexpected keyword argument `{1}`.  Extra attributes must be declared in the `__slots__` of a Fieldset subclass.'.format(name, key))
             setattr(self, key, value)
+        self._frozen = True
+
+    @classmethod
+    def get_declared_attributes(cls):
+        """
+        Returns the names of the attributes that can be passed as keyword
+        arguments, collected once per class from the ``__slots__`` of the
+        class and its bases.
+        """
+        try:
+            return cls.__dict__['_declared_attributes']
+        except KeyError:
+            pass
+        declared = set()
+        for klass in cls.__mro__:
+            slots = klass.__dict__.get('__slots__', ())
+            declared.update((slots,) if isinstance(slots, str) else slots)
+        declared = frozenset(
+            name for name in declared
+            if not name.startswith('_') and name not in cls.frozen_attributes
+        )
+        cls._declared_attributes = declared
+        return declared
+
+    def __getattr__(self, name):
+        # Only called when a slot hasn't been set.
+        if name in ('fields', '_paths', 'fieldset_names'):
+            self._index()
+            return getattr(self, name)
+        try:
+            return self.attribute_defaults[name]
+        except KeyError:
+            raise AttributeError('{0!r} object has no attribute {1!r}'.format(type(self).__name__, name))
+
+    def _index(self):
+        """
+        Precomputes the flattened field names, the path to every nested field
+        and fieldset, and the names of all the nested fieldsets, in a single
+        walk of the tree.  The root fieldset is indexed when it is created, the
+        fieldsets nested in its declaration only when they are used.
+
+        Field and fieldset names must be unique across the whole tree, all of
+        the conflicting names are reported in a single error.
+        """
+        fields = []
+        paths = {}
+        fieldset_names = set()
+        conflicts = OrderedDict()
+        stack = [((), iter(self.base_fields))]
+        while stack:
+            path, rows = stack[-1]
+            for row in rows:
+                name = row if isinstance(row, str) else row.name
+                if name in paths:
+                    conflicts[name] = True
+                else:
+                    paths[name] = path
+                if isinstance(row, str):
+                    fields.append(row)
+                else:
+                    fieldset_names.add(name)
+                    stack.append((path + (name,), iter(row.base_fields)))
+                    break
+            else:
+                stack.pop()
+        if conflicts:
+            raise AttributeError('Name Conflict in fieldset `{0}`.  The name(s) `{1}` appear multiple times.'.format(self.name, list(conflicts)))
+        # Nested fieldsets are indexed after they are frozen.
+        set_attribute = super().__setattr__
+        set_attribute('fields', tuple(fields))
+        # A plain dict, because mapping proxies can't be copied or pickled.
+        set_attribute('_paths', paths)
+        set_attribute('fieldset_names', frozenset(fieldset_names))
+
+    @property
+    def paths(self):
+        return MappingProxyType(self._paths)
+
+    def __setattr__(self, name, value):
+        if name in self.frozen_attributes and getattr(self, '_frozen', False):
+            raise AttributeError('Can\'t set `{0}` on fieldset `{1}`, fieldsets are frozen after construction.'.format(name, self.name))
+        super().__setattr__(name, value)
 
     def __iter__(self):
         return iter(self.base_fields)
@@ -104,11 +575,16 @@ class Fieldset(CSSClassMixin):
         return self.name
 
     @property
-    def fields(self):
-        return flatten_to_tuple(self)
+    def render_plan(self):
+        try:
+            return self._render_plan
+        except AttributeError:
+            self._render_plan = compile_render_plan(self)
+            return self._render_plan
 
 
 class BoundFieldset:
+    __slots__ = ('form', 'name', 'fieldset', 'rows', 'row_names', '_bound_fieldsets')
     is_fieldset = True
 
     def __init__(self, form, fieldset, name):
@@ -118,6 +594,8 @@ class BoundFieldset:
         self.rows = OrderedDict()
         for row in fieldset:
             self.rows[str(row)] = row
+        self.row_names = tuple(self.rows)
+        self._bound_fieldsets = {}
 
     def __getitem__(self, key):
         """
@@ -127,25 +605,83 @@ class BoundFieldset:
         # returns the item in the fieldset under the key 'name'
         """
         if isinstance(key, int) and not key in self.rows:
-            return self[list(self.rows.keys())[key]]
+            return self[self.row_names[key]]
         value = self.rows[key]
         if isinstance(value, str):
             return self.form[value]
-        else:
-            return type(self)(self.form, value, key)
+        try:
+            return self._bound_fieldsets[key]
+        except KeyError:
+            bound_fieldset = self._bound_fieldsets[key] = type(self)(self.form, value, key)
+            return bound_fieldset
 
     def __str__(self):
+        return render_instrumented(
+            fieldset_rendered,
+            lambda: self.form.render_cached(self.render, 'fieldset', self.name, self.template_name),
+            self.form, fieldset=self,
+        )
+
+    def render(self):
+        return mark_safe(''.join(self._iter_render()))
+
+    def iter_render(self):
+        """
+        Yields the HTML of the fieldset in chunks, which joined together are
+        the same as ``str(fieldset)``.
+        """
+        if self.form.is_render_cacheable():
+            yield str(self)
+        else:
+            yield from self._iter_render()
+
+    def _iter_render(self):
+        plan = None
+        if self.form.can_use_render_plan(*FIELDSET_TEMPLATE_NAMES) and not self.template_name:
+            plan = getattr(self.fieldset, 'render_plan', None)
+        if plan is not None:
+            field_template_name = 'betterforms/field_as_div.html'
+            renderer = self.form.get_field_renderer(field_template_name)
+            if renderer is None:
+                yield self.render_start()
+            else:
+                yield renderer.render_fieldset_start(self)
+            yield from iter_render_plan(self, plan, field_template_name, renderer)
+            yield '</fieldset>'
+            return
         env = {
             'fieldset': self,
             'form': self.form,
             'fieldset_template_name': 'betterforms/fieldset_as_div.html',
+            'field_template_name': 'betterforms/field_as_div.html',
         }
         # TODO: don't hardcode the default template name.
-        return render_to_string(self.template_name or 'betterforms/fieldset_as_div.html', env)
+        yield render_to_string(self.template_name or 'betterforms/fieldset_as_div.html', env, using=self.form.template_engine)
+
+    def render_start(self):
+        """
+        Renders the opening ``<fieldset>`` tag, the legend and the fieldset
+        errors, the same way ``betterforms/fieldset_as_div.html`` does.
+        """
+        return self.render_chrome(self.css_classes) + conditional_escape(self.errors)
+
+    def render_chrome(self, css_classes):
+        """
+        Renders the opening ``<fieldset>`` tag with ``css_classes`` and the
+        legend.
+        """
+        html = format_html('<fieldset class="{0}">', css_classes)
+        if self.legend:
+            html += format_html('<legend>{0}</legend>', self.legend)
+        return html
 
     def __iter__(self):
+        stats = current_render_stats.get()
         for name in self.rows.keys():
-            yield self[name]
+            item = self[name]
+            if stats is not None:
+                stats.count(item)
+            yield item
 
     @property
     def template_name(self):
@@ -157,9 +693,12 @@ class BoundFieldset:
 
     @property
     def css_classes(self):
+        return self.get_css_classes(bool(self.errors))
+
+    def get_css_classes(self, has_errors):
         css_classes = set((self.fieldset.FIELDSET_CSS_CLASS, self.name))
         css_classes.update(self.fieldset.css_classes or [])
-        if self.errors:
+        if has_errors:
             css_classes.add(self.fieldset.error_css_class)
         return ' '.join(css_classes)
 
@@ -173,12 +712,176 @@ class FieldsetMixin(NonBraindamagedErrorMixin):
     fieldset_class = Fieldset
     bound_fieldset_class = BoundFieldset
     base_fieldsets = None
+    use_render_plan = True
+    # Pre-render the parts of the fields and fieldsets that don't depend on
+    # the form data once per form class and language.  Only enable this for
+    # forms whose labels, help texts and required flags don't change per
+    # instance.
+    use_static_fragments = False
+    # How many sets of static fragments (one per language, prefix and field
+    # template) are kept per form class, the least recently used are dropped.
+    static_fragments_cache_size = 32
+    # The alias of the cache used to store the renders of unbound forms, or
+    # ``None`` to disable the render cache.
+    render_cache_alias = None
+    render_cache_timeout = DEFAULT_TIMEOUT
+    # The name of the template engine used to render the form, ``None`` uses
+    # the first engine that has the template.
+    template_engine = None
+    # Set to ``'native'`` to render the fields and fieldsets in Python instead
+    # of with the templates.  Fieldsets with a ``template_name`` are still
+    # rendered with their template.
+    fieldset_renderer = None
+
+    def get_render_plan(self):
+        """
+        Returns the render plan of ``base_fieldsets``, or ``None`` if the form
+        has to be rendered with the templates.  The plan is compiled once and
+        cached on the fieldset, so forms that set their own ``base_fieldsets``
+        in ``__init__`` get the plan of their fieldsets.
+        """
+        fieldsets = self.base_fieldsets
+        if fieldsets is None or any(isinstance(row, str) for row in fieldsets):
+            return None
+        return fieldsets.render_plan
+
+    def can_use_render_plan(self, *template_names):
+        """
+        Returns whether the form can be rendered with the render plan instead
+        of ``template_names``, which is only the case when the form doesn't
+        have a ``template_name`` and the templates aren't overridden.
+        """
+        return (
+            self.use_render_plan
+            and not self.template_name
+            and all(is_packaged_template(name, self.template_engine) for name in template_names)
+        )
+
+    def get_field_renderer(self, field_template_name):
+        """
+        Returns the object rendering the fields and fieldsets of the render
+        plan, or ``None`` to render them with the field template.
+        """
+        if self.fieldset_renderer == 'native':
+            return NativeRenderer(field_template_name)
+        return self.get_static_fragments(field_template_name)
+
+    def get_static_fragments(self, field_template_name):
+        """
+        Returns the ``StaticFragments`` of the form class for the active
+        language, or ``None`` if ``use_static_fragments`` is off.  Only the
+        ``static_fragments_cache_size`` most recently used are kept, so that
+        forms with a prefix per request don't grow the cache without bound.
+        """
+        if not self.use_static_fragments:
+            return None
+        cls = type(self)
+        try:
+            cache = cls.__dict__['_static_fragments']
+        except KeyError:
+            cache = cls._static_fragments = OrderedDict()
+        key = (
+            get_language(), self.template_engine, field_template_name,
+            self.prefix, self.auto_id, self.label_suffix,
+        )
+        try:
+            fragments = cache[key]
+        except KeyError:
+            fragments = cache[key] = StaticFragments(field_template_name, self.template_engine)
+            # Other threads may evict the same entries.
+            try:
+                while len(cache) > self.static_fragments_cache_size:
+                    cache.popitem(last=False)
+            except KeyError:
+                pass
+        else:
+            try:
+                cache.move_to_end(key)
+            except KeyError:
+                pass
+        return fragments
+
+    @classmethod
+    def get_render_cache_stats(cls):
+        """
+        Returns the hit and miss counters of the render cache for the form
+        class.
+        """
+        try:
+            return cls.__dict__['_render_cache_stats']
+        except KeyError:
+            stats = cls._render_cache_stats = Counter(hits=0, misses=0)
+            return stats
+
+    def get_render_cache_key(self, *parts):
+        """
+        Returns the render cache key of the form for the given parts, which
+        describe what is being rendered.  The fields are part of the key, so
+        that forms whose fields are customised per instance, such as choices
+        limited to a user, don't share their renders.
+        """
+        cls = type(self)
+        initial = sorted((str(name), get_value_fingerprint(value)) for name, value in self.initial.items())
+        fields = [(name, get_field_fingerprint(field)) for name, field in self.fields.items()]
+        renderer = type(self.renderer)
+        key = (
+            cls.__module__, cls.__qualname__, self.prefix, self.auto_id,
+            self.label_suffix, self.use_required_attribute, renderer.__module__,
+            renderer.__qualname__, get_language(), initial, fields, self.template_engine,
+        ) + parts
+        return 'betterforms.render.{0}'.format(hashlib.sha1(repr(key).encode('utf-8')).hexdigest())
+
+    def is_render_cacheable(self):
+        """
+        Returns whether the renders of the form are stored in the render cache,
+        which is only the case for unbound forms without errors.  Forms with
+        callable initial values aren't cached either, as their value changes
+        from one render to the next.
+        """
+        return (
+            self.render_cache_alias is not None
+            and not self.is_bound
+            and not self._errors
+            and not any(callable(value) for value in self.initial.values())
+            and not any(callable(field.initial) for field in self.fields.values())
+        )
+
+    def render_cached(self, render, *parts):
+        """
+        Returns the output of ``render()``, stored in the
+        ``render_cache_alias`` cache if the form is cacheable.
+        """
+        if not self.is_render_cacheable():
+            return render()
+        cache = caches[self.render_cache_alias]
+        key = self.get_render_cache_key(*parts)
+        stats = self.get_render_cache_stats()
+        html = cache.get(key)
+        if html is None:
+            stats['misses'] += 1
+            html = str(render())
+            cache.set(key, html, self.render_cache_timeout)
+        else:
+            stats['hits'] += 1
+        return mark_safe(html)
 
     @property
     def fieldsets(self):
+        """
+        The bound fieldset tree of the form.  It is built once per form
+        instance and rebuilt if ``base_fieldsets`` or the names in ``fields``
+        change.
+        """
+        key = (self.base_fieldsets, tuple(self.fields))
+        cached = getattr(self, '_fieldsets_cache', None)
+        if cached is not None and cached[0] == key:
+            return cached[1]
         if self.base_fieldsets is None:
-            return self.bound_fieldset_class(self, self.fields.keys(), '__base_fieldset__')
-        return self.bound_fieldset_class(self, self.base_fieldsets, self.base_fieldsets.name)
+            fieldsets = self.bound_fieldset_class(self, self.fields.keys(), '__base_fieldset__')
+        else:
+            fieldsets = self.bound_fieldset_class(self, self.base_fieldsets, self.base_fieldsets.name)
+        self._fieldsets_cache = (key, fieldsets)
+        return fieldsets
 
     def __getitem__(self, key):
         try:
@@ -203,12 +906,43 @@ class FieldsetMixin(NonBraindamagedErrorMixin):
         raise NotImplementedError('To be implemented')
 
     def as_p(self):
+        return render_instrumented(
+            form_rendered,
+            lambda: self.render_cached(self._as_p, 'as_p', self.template_name),
+            self,
+        )
+
+    def _as_p(self):
+        return mark_safe(''.join(self._iter_as_p()))
+
+    def iter_render(self, method='as_p'):
+        """
+        Yields the HTML of the form in chunks, which joined together are the
+        same as ``getattr(form, method)()``.  Only ``as_p`` is streamed, the
+        other methods are yielded as a single chunk.
+        """
+        if method != 'as_p' or self.is_render_cacheable():
+            yield getattr(self, method)()
+        else:
+            yield from self._iter_as_p()
+
+    def _iter_as_p(self):
+        plan = None
+        if self.can_use_render_plan(*AS_P_TEMPLATE_NAMES):
+            plan = self.get_render_plan()
+        if plan is not None:
+            yield conditional_escape(self.media)
+            yield conditional_escape(self.non_field_errors())
+            field_template_name = 'betterforms/field_as_p.html'
+            renderer = self.get_field_renderer(field_template_name)
+            yield from iter_render_plan(self.fieldsets, plan, field_template_name, renderer)
+            return
         env = {
             'form': self,
             'fieldset_template_name': 'betterforms/fieldset_as_p.html',
             'field_template_name': 'betterforms/field_as_p.html',
         }
-        return render_to_string(self.template_name or 'betterforms/form_as_p.html', env)
+        yield render_to_string(self.template_name or 'betterforms/form_as_p.html', env, using=self.template_engine)
 
 
 def get_fieldsets(bases, attrs):
@@ -243,7 +977,7 @@ class BetterModelFormMetaclass(forms.models.ModelFormMetaclass):
             attrs['base_fieldsets'] = base_fieldsets
             Meta = attrs.get('Meta')
             if Meta and Meta.__dict__.get('fields') is None and Meta.__dict__.get('exclude') is None:
-                attrs['Meta'].fields = flatten_to_tuple(base_fieldsets)
+                attrs['Meta'].fields = base_fieldsets.fields
         attrs['base_fieldsets'] = base_fieldsets
         return super().__new__(cls, name, bases, attrs)
 
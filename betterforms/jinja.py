@@ -0,0 +1,20 @@
+"""
+Jinja2 support for the betterforms templates.  Use :func:`environment` as the
+``environment`` option of a Jinja2 template backend, or call
+:func:`update_environment` from your own environment factory.
+"""
+from jinja2 import Environment
+
+from betterforms.templatetags.betterforms_tags import is_checkbox
+
+
+def update_environment(env):
+    """
+    Registers the globals used by the betterforms Jinja2 templates.
+    """
+    env.globals['is_checkbox'] = is_checkbox
+    return env
+
+
+def environment(**options):
+    return update_environment(Environment(**options))
@@ -1,13 +1,168 @@
+import asyncio
+import threading
+import time
+from contextlib import ExitStack
 from itertools import chain
 from operator import add
 from collections import OrderedDict
 
+from asgiref.sync import sync_to_async
+from django.db import connections, router, transaction
 from django.forms import BaseFormSet
+from django.forms.renderers import DjangoTemplates
+from django.forms.models import BaseModelForm, BaseModelFormSet
 from django.forms.utils import ErrorList
 from django.core.exceptions import ValidationError, NON_FIELD_ERRORS
+from django.utils.html import conditional_escape
 from django.utils.safestring import mark_safe
 from functools import reduce
 
+from betterforms.signals import child_form_validated
+
+
+async def avalidate_form(form, thread_sensitive=True):
+    """
+    Validates ``form`` from async code, returning whether it is valid.  Forms
+    that provide an ``ais_valid`` method are awaited directly, other forms are
+    validated with ``sync_to_async``.
+    """
+    if hasattr(form, 'ais_valid'):
+        return await form.ais_valid()
+    return await sync_to_async(form.is_valid, thread_sensitive=thread_sensitive)()
+
+
+def iter_render_form(form, method):
+    """
+    Yields the HTML of ``getattr(form, method)()`` in chunks.  Forms that
+    provide an ``iter_render`` method are streamed, and so are the forms of
+    formsets rendered with Django's default formset templates.  Other forms
+    are yielded as a single chunk.
+    """
+    if hasattr(form, 'iter_render'):
+        yield from form.iter_render(method)
+    elif (
+        isinstance(form, BaseFormSet)
+        and method in ('as_p', 'as_table', 'as_ul')
+        and type(form.renderer) is DjangoTemplates
+        and getattr(form, 'template_name_' + method[3:]) == 'django/forms/formsets/{0}.html'.format(method[3:])
+    ):
+        # Mirrors ``django/forms/formsets/<p|table|ul>.html``, whose output
+        # is stripped by the renderer.
+        chunks = chain(
+            [conditional_escape(form.management_form)],
+            chain.from_iterable(iter_render_form(child, method) for child in form),
+        )
+        yield from strip_chunks(chunks)
+    else:
+        yield getattr(form, method)()
+
+
+def strip_chunks(chunks):
+    """
+    Yields ``chunks`` without the leading and trailing whitespace of their
+    concatenation.  Trailing whitespace is held back until a chunk with more
+    content comes along.
+    """
+    started = False
+    pending = ''
+    for chunk in chunks:
+        if not started:
+            chunk = chunk.lstrip()
+            started = bool(chunk)
+        stripped = chunk.rstrip()
+        if stripped:
+            yield pending + stripped
+            pending = chunk[len(stripped):]
+        else:
+            pending += chunk
+
+
+async def asave_form(form, commit=True, thread_sensitive=True):
+    """
+    Saves ``form`` from async code.  Forms that provide an ``asave`` method are
+    awaited directly, other forms are saved with ``sync_to_async``.
+    """
+    if hasattr(form, 'asave'):
+        return await form.asave(commit)
+    return await sync_to_async(form.save, thread_sensitive=thread_sensitive)(commit)
+
+
+def bulk_save_instances(instances):
+    """
+    Saves model instances with one ``bulk_create`` and one ``bulk_update`` per
+    model, instead of one query per instance.  On databases that can't return
+    the primary keys of bulk inserted rows, and for multi-table inheritance
+    models, which ``bulk_create`` doesn't support, new instances are saved
+    one by one.
+    """
+    created, updated = OrderedDict(), OrderedDict()
+    for instance in instances:
+        group = created if instance._state.adding else updated
+        group.setdefault(type(instance), []).append(instance)
+
+    for model, objs in created.items():
+        using = router.db_for_write(model)
+        is_inherited = any(
+            parent._meta.concrete_model is not model._meta.concrete_model
+            for parent in model._meta.get_parent_list()
+        )
+        if connections[using].features.can_return_rows_from_bulk_insert and not is_inherited:
+            model._base_manager.using(using).bulk_create(objs)
+        else:
+            for obj in objs:
+                obj.save(using=using)
+
+    for model, objs in updated.items():
+        fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+        # Like Model.save, give fields such as auto_now a chance to update.
+        for obj in objs:
+            for field in fields:
+                setattr(obj, field.attname, field.pre_save(obj, False))
+        model._base_manager.using(router.db_for_write(model)).bulk_update(
+            objs, [field.name for field in fields],
+        )
+
+
+def bulk_save_m2m(forms, created):
+    """
+    Saves the many-to-many data of model forms whose instances have been
+    saved.  The rows of auto-created through tables for the instances in
+    ``created`` (a set of instance ids) are inserted with one ``bulk_create``
+    per through model, everything else is saved like ``ModelForm.save_m2m``
+    does.
+    """
+    through_rows = OrderedDict()
+    for form in forms:
+        instance = form.instance
+        opts = instance._meta
+        for field in chain(opts.many_to_many, opts.private_fields):
+            if not hasattr(field, 'save_form_data'):
+                continue
+            if form._meta.fields and field.name not in form._meta.fields:
+                continue
+            if form._meta.exclude and field.name in form._meta.exclude:
+                continue
+            if field.name not in form.cleaned_data:
+                continue
+            value = form.cleaned_data[field.name]
+            through = getattr(field.remote_field, 'through', None)
+            if id(instance) not in created or not field.many_to_many or not through._meta.auto_created:
+                field.save_form_data(instance, value)
+                continue
+            source = through._meta.get_field(field.m2m_field_name())
+            target = through._meta.get_field(field.m2m_reverse_field_name())
+            source_value = getattr(instance, source.target_field.attname)
+            through_rows.setdefault(through, []).extend(
+                through(**{
+                    source.attname: source_value,
+                    target.attname: getattr(obj, target.target_field.attname),
+                })
+                for obj in value
+            )
+
+    for through, rows in through_rows.items():
+        through._base_manager.using(router.db_for_write(through)).bulk_create(rows)
+
 
 class MultiForm:
     """
@@ -17,6 +172,8 @@ class MultiForm:
     else that you are using a MultiForm.
     """
     form_classes = {}
+    validation_executor = None
+    async_thread_sensitive = True
 
     def __init__(self, data=None, files=None, *args, **kwargs):
         # Some things, such as the WizardView expect these to exist.
@@ -31,6 +188,10 @@ class MultiForm:
             self.initials = {}
         self.forms = OrderedDict()
         self.crossform_errors = []
+        self._errors = None
+        self._fields = None
+        self._cleaned_data = None
+        self._valid_form_keys = None
 
         for key, form_class in self.form_classes.items():
             fargs, fkwargs = self.get_form_args_kwargs(key, args, kwargs)
@@ -60,23 +221,46 @@ class MultiForm:
 
     @property
     def errors(self):
-        errors = {}
-        for form_name in self.forms:
-            form = self.forms[form_name]
-            for field_name in form.errors:
-                errors[form.add_prefix(field_name)] = form.errors[field_name]
-        if self.crossform_errors:
-            errors[NON_FIELD_ERRORS] = self.crossform_errors
-        return errors
+        """
+        The errors of all the child forms, keyed by prefixed field name.  They
+        are collected once and reused until the form is validated again or a
+        crossform error is added.
+        """
+        has_crossform_errors = bool(self.crossform_errors)
+        if self._errors is None or self._errors[0] != has_crossform_errors:
+            errors = {}
+            for form in self.forms.values():
+                for field_name, field_errors in form.errors.items():
+                    errors[form.add_prefix(field_name)] = field_errors
+            if has_crossform_errors:
+                errors[NON_FIELD_ERRORS] = self.crossform_errors
+            self._errors = (has_crossform_errors, errors)
+        return self._errors[1]
 
     @property
     def fields(self):
-        fields = []
-        for form_name in self.forms:
-            form = self.forms[form_name]
-            for field_name in form.fields:
-                fields += [form.add_prefix(field_name)]
-        return fields
+        """
+        An OrderedDict of the fields of all the child forms, keyed by prefixed
+        field name.
+        """
+        if self._fields is None:
+            self._fields = OrderedDict(
+                (form.add_prefix(field_name), field)
+                for form in self.forms.values()
+                for field_name, field in form.fields.items()
+            )
+        return self._fields
+
+    def reset_cache(self):
+        """
+        Clears the cached ``errors``, ``fields`` and ``cleaned_data``.  Call
+        this if you modify the child forms directly after the ``MultiForm``
+        has used them.
+        """
+        self._errors = None
+        self._fields = None
+        self._cleaned_data = None
+        self._valid_form_keys = None
 
     def __iter__(self):
         # TODO: Should the order of the fields be controllable from here?
@@ -96,9 +280,94 @@ class MultiForm:
 
     def add_crossform_error(self, e):
         self.crossform_errors.append(e)
+        self._errors = None
+
+    def get_validation_executor(self):
+        """
+        Returns the :class:`concurrent.futures.Executor` used to validate the
+        child forms concurrently, or ``None`` to validate them one after the
+        other.
+        """
+        return self.validation_executor
+
+    def validate_forms(self):
+        """
+        Runs the validation of every child form and returns an OrderedDict of
+        whether each of them is valid.  If there is a validation executor, the
+        child forms are cleaned concurrently on it.
+        """
+        executor = self.get_validation_executor()
+        if executor is None:
+            return OrderedDict(
+                (key, self.validate_form(key, form))
+                for key, form in self.forms.items()
+            )
+        thread = threading.current_thread()
+        futures = [
+            (key, executor.submit(self._validate_form_in_executor, key, form, thread))
+            for key, form in self.forms.items()
+        ]
+        return OrderedDict((key, future.result()) for key, future in futures)
+
+    def _validate_form_in_executor(self, key, form, thread):
+        try:
+            return self.validate_form(key, form)
+        finally:
+            # The database connections of a worker thread would otherwise stay
+            # open for as long as the thread lives.  Executors that run the
+            # task in the submitting thread must keep its connections.
+            if threading.current_thread() is not thread:
+                connections.close_all()
+
+    def validate_form(self, key, form):
+        """
+        Validates a single child form.  Sends ``child_form_validated`` with the
+        validation time if it has receivers.
+        """
+        if not child_form_validated.has_listeners(type(self)):
+            return form.is_valid()
+        start = time.perf_counter()
+        is_valid = form.is_valid()
+        self._send_child_form_validated(key, form, time.perf_counter() - start, is_valid)
+        return is_valid
+
+    def _send_child_form_validated(self, key, form, duration, is_valid):
+        child_form_validated.send(
+            sender=type(self), multiform=self, key=key, form=form,
+            duration=duration, is_valid=is_valid,
+        )
 
     def is_valid(self):
-        forms_valid = all(form.is_valid() for form in self.forms.values())
+        self.reset_cache()
+        return self._finish_validation([
+            key for key, is_valid in self.validate_forms().items() if is_valid
+        ])
+
+    async def _avalidate_form(self, key, form):
+        start = time.perf_counter()
+        is_valid = await avalidate_form(form, self.async_thread_sensitive)
+        if child_form_validated.has_listeners(type(self)):
+            self._send_child_form_validated(key, form, time.perf_counter() - start, is_valid)
+        return is_valid
+
+    async def ais_valid(self):
+        """
+        Async version of :meth:`is_valid`, the child forms are validated
+        concurrently with ``asyncio.gather``.
+        """
+        self.reset_cache()
+        results = await asyncio.gather(*(
+            self._avalidate_form(key, form)
+            for key, form in self.forms.items()
+        ))
+        return await sync_to_async(self._finish_validation)([
+            key for key, is_valid in zip(self.forms, results) if is_valid
+        ])
+
+    def _finish_validation(self, valid_form_keys):
+        self._valid_form_keys = valid_form_keys
+        forms_valid = len(valid_form_keys) == len(self.forms)
+        self._collect_cleaned_data()
         try:
             self.cleaned_data = self.clean()
         except ValidationError as e:
@@ -121,6 +390,15 @@ class MultiForm:
     def as_p(self):
         return mark_safe(''.join(form.as_p() for form in self.forms.values()))
 
+    def iter_render(self, method='as_table'):
+        """
+        Yields the HTML of the child forms in chunks, which joined together
+        are the same as ``getattr(multiform, method)()``.  This can be passed
+        to a ``StreamingHttpResponse``.
+        """
+        for form in self.forms.values():
+            yield from iter_render_form(form, method)
+
     def is_multipart(self):
         return any(form.is_multipart() for form in self.forms.values())
 
@@ -136,12 +414,25 @@ class MultiForm:
     def visible_fields(self):
         return [field for field in self if not field.is_hidden]
 
+    def _collect_cleaned_data(self):
+        if self._valid_form_keys is None:
+            self._valid_form_keys = [
+                key for key, form in self.forms.items() if form.is_valid()
+            ]
+        self._cleaned_data = OrderedDict(
+            (key, self.forms[key].cleaned_data)
+            for key in self._valid_form_keys
+        )
+
     @property
     def cleaned_data(self):
-        return OrderedDict(
-            (key, form.cleaned_data)
-            for key, form in self.forms.items() if form.is_valid()
-        )
+        """
+        The ``cleaned_data`` of the valid child forms.  It is collected once
+        during validation instead of validating the children on every access.
+        """
+        if self._cleaned_data is None:
+            self._collect_cleaned_data()
+        return self._cleaned_data
 
     @cleaned_data.setter
     def cleaned_data(self, data):
@@ -152,6 +443,7 @@ class MultiForm:
                     formlet.cleaned_data = formlet_data
             else:
                 child_form.cleaned_data = value
+        self._collect_cleaned_data()
 
 
 class MultiModelForm(MultiForm):
@@ -160,6 +452,8 @@ class MultiModelForm(MultiForm):
     means that it includes support for the instance parameter in initialization
     and adds a save method.
     """
+    bulk_save = False
+
     def __init__(self, *args, **kwargs):
         self.instances = kwargs.pop('instance', None)
         if self.instances is None:
@@ -177,16 +471,73 @@ class MultiModelForm(MultiForm):
         return fargs, fkwargs
 
     def save(self, commit=True):
+        if commit and self.bulk_save:
+            return self.save_bulk()
         objects = OrderedDict(
             (key, form.save(commit))
             for key, form in self.forms.items()
         )
+        self._add_save_m2m()
+        return objects
 
+    def save_bulk(self):
+        """
+        Saves the ModelForm and model formset children inside one transaction,
+        grouping their instances by model to save them with ``bulk_create``
+        and ``bulk_update``, and batching the inserts into many-to-many through
+        tables.  Other children are saved afterwards with their own ``save``
+        method.
+        """
+        objects = OrderedDict((key, None) for key in self.forms)
+        model_forms, instances, deleted, other_keys = [], [], [], []
+        for key, form in self.forms.items():
+            if isinstance(form, BaseModelForm):
+                objects[key] = form.save(commit=False)
+                model_forms.append(form)
+                instances.append(objects[key])
+            elif isinstance(form, BaseModelFormSet):
+                objects[key] = form.save(commit=False)
+                model_forms.extend(form.saved_forms)
+                instances.extend(objects[key])
+                deleted.extend(form.deleted_objects)
+            else:
+                other_keys.append(key)
+
+        created = {id(instance) for instance in instances if instance._state.adding}
+        databases = {router.db_for_write(type(obj)) for obj in chain(instances, deleted)}
+        with ExitStack() as stack:
+            for using in sorted(databases):
+                stack.enter_context(transaction.atomic(using=using))
+            deleted_pks = OrderedDict()
+            for obj in deleted:
+                deleted_pks.setdefault(type(obj), []).append(obj.pk)
+            for model, pks in deleted_pks.items():
+                model._base_manager.using(router.db_for_write(model)).filter(pk__in=pks).delete()
+            bulk_save_instances(instances)
+            bulk_save_m2m(model_forms, created)
+            for key in other_keys:
+                objects[key] = self.forms[key].save()
+        return objects
+
+    async def asave(self, commit=True):
+        """
+        Async version of :meth:`save`, the child forms are saved concurrently
+        with ``asyncio.gather``.  With ``bulk_save``, :meth:`save_bulk` runs
+        in a thread instead.
+        """
+        if commit and self.bulk_save:
+            return await sync_to_async(self.save_bulk, thread_sensitive=self.async_thread_sensitive)()
+        objects = await asyncio.gather(*(
+            asave_form(form, commit, self.async_thread_sensitive)
+            for form in self.forms.values()
+        ))
+        self._add_save_m2m()
+        return OrderedDict(zip(self.forms, objects))
+
+    def _add_save_m2m(self):
         if any(hasattr(form, 'save_m2m') for form in self.forms.values()):
             def save_m2m():
                 for form in self.forms.values():
                     if hasattr(form, 'save_m2m'):
                         form.save_m2m()
             self.save_m2m = save_m2m
-
-        return objects
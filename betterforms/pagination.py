@@ -0,0 +1,152 @@
+"""
+Paginators that avoid a full ``COUNT(*)`` of the paginated queryset.
+"""
+import hashlib
+
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+
+
+def get_count_cache_key(queryset):
+    """
+    Returns a cache key for the count of ``queryset``, made from its SQL and
+    parameters without the ordering, which doesn't change the count.  The
+    parameters are kept apart because ``str(query)`` doesn't quote them.
+    """
+    sql, params = queryset.order_by().query.sql_with_params()
+    signature = '{0}:{1}:{2!r}'.format(queryset.db, sql, params)
+    return 'betterforms.count.{0}'.format(hashlib.sha1(signature.encode('utf-8')).hexdigest())
+
+
+def estimate_count(queryset):
+    """
+    Returns the query planner's estimate of the number of rows of an
+    unfiltered ``queryset``, or ``None`` if there isn't one, either because the
+    queryset is filtered or because the database doesn't provide estimates.
+    """
+    query = queryset.query
+    if query.where or query.distinct or query.combinator or query.low_mark or query.high_mark is not None:
+        return None
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples FROM pg_class WHERE oid = %s::regclass'
+        params = [connection.ops.quote_name(table)]
+    elif connection.vendor == 'mysql':
+        sql = 'SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s'
+        params = [table]
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    # PostgreSQL reports -1 for tables that were never analyzed.
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Caches the count of the queryset for ``timeout`` seconds, keyed by its
+    SQL.  The pages of the same filters share the count.
+    """
+    def __init__(self, *args, cache_alias='default', timeout=60, **kwargs):
+        self.cache_alias = cache_alias
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    @cached_property
+    def count(self):
+        if not hasattr(self.object_list, 'query') or self.object_list.query.is_empty():
+            return super().count
+        try:
+            key = get_count_cache_key(self.object_list)
+        except EmptyResultSet:
+            # The query can't match anything, so it has no SQL to key by.
+            return super().count
+        cache = caches[self.cache_alias]
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, self.timeout)
+        return count
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses the query planner's row estimate as the count of unfiltered
+    querysets with at least ``exact_threshold`` rows.  Filtered querysets,
+    small tables and databases without estimates are counted exactly.
+    """
+    def __init__(self, *args, exact_threshold=10000, **kwargs):
+        self.exact_threshold = exact_threshold
+        super().__init__(*args, **kwargs)
+
+    @cached_property
+    def count(self):
+        if hasattr(self.object_list, 'query'):
+            estimate = estimate_count(self.object_list)
+            if estimate is not None and estimate >= self.exact_threshold:
+                return estimate
+        return super().count
+
+
+class NoCountPage(Page):
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def __repr__(self):
+        return '<Page {0}>'.format(self.number)
+
+    def has_next(self):
+        return self._has_next
+
+    def start_index(self):
+        if not self.object_list:
+            return 0
+        return (self.paginator.per_page * (self.number - 1)) + 1
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1 if self.object_list else 0
+
+
+class NoCountPaginator(Paginator):
+    """
+    Never counts the queryset.  Each page fetches one extra row to know
+    whether there is a next page, so ``count``, ``num_pages`` and
+    ``page_range`` aren't available.
+    """
+    @property
+    def count(self):
+        return None
+
+    @property
+    def num_pages(self):
+        return None
+
+    def validate_number(self, number):
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_('That page number is not an integer'))
+        if number < 1:
+            raise EmptyPage(_('That page number is less than 1'))
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(self.object_list[bottom:bottom + self.per_page + 1])
+        has_next = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+        if not object_list and (number > 1 or not self.allow_empty_first_page):
+            raise EmptyPage(_('That page contains no results'))
+        return NoCountPage(object_list, number, self, has_next)
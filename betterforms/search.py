@@ -0,0 +1,162 @@
+"""
+Search backends for :class:`~betterforms.changelist.SearchForm`.
+
+A backend turns a search query and the fields to search over into a ``Q``
+object that the form uses to filter its queryset.
+"""
+import re
+from collections import namedtuple
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+SEARCH_TERM_RE = re.compile(r'(?:(?P<field>\w+):)?(?:"(?P<phrase>[^"]*)"?|(?P<word>\S+))')
+
+SearchTerm = namedtuple('SearchTerm', ('field', 'term', 'text'))
+
+
+def parse_search_query(query):
+    """
+    Splits ``query`` into a list of ``SearchTerm``.  Terms are separated by
+    whitespace, unless they are quoted phrases, and can be prefixed with the
+    name of a field and a colon, as in ``email:foo`` or ``name:"john smith"``.
+    ``field`` is ``None`` for terms without one, and ``text`` is the term as
+    it was written, prefix and quotes included.
+    """
+    terms = []
+    for match in SEARCH_TERM_RE.finditer(query):
+        term = match.group('word') if match.group('phrase') is None else match.group('phrase')
+        if term.strip():
+            terms.append(SearchTerm(match.group('field'), term.strip(), match.group(0)))
+    return terms
+
+
+LOOKUP_PREFIXES = {
+    '^': 'startswith',
+    '=': 'exact',
+    '@': 'search',
+}
+
+
+def parse_search_field(field):
+    """
+    Splits a ``SEARCH_FIELDS`` entry into the field name and the lookup of
+    its prefix, which is ``None`` for entries without one.
+    """
+    if field[:1] in LOOKUP_PREFIXES:
+        return field[1:], LOOKUP_PREFIXES[field[0]]
+    return field, None
+
+
+class SearchBackend:
+    def get_filter(self, fields, query, case_sensitive=False):
+        """
+        Returns a ``Q`` object matching the rows where ``query`` is found in
+        any of ``fields``.
+        """
+        raise NotImplementedError('Subclasses must implement `get_filter`.')
+
+    def get_lookup_filter(self, fields, query, case_sensitive=False, default_lookup='contains'):
+        """
+        Ors together a lookup on every field, chosen by the prefix of the
+        field, or ``default_lookup`` for fields without one.  The lookups are
+        case insensitive unless ``case_sensitive`` is set.
+        """
+        conditions = []
+        for field in fields:
+            name, lookup = parse_search_field(field)
+            lookup = lookup or default_lookup
+            if lookup != 'search' and not case_sensitive:
+                lookup = 'i' + lookup
+            conditions.append(Q(**{'{0}__{1}'.format(name, lookup): query}))
+        return reduce(or_, conditions, Q())
+
+    def split_fields(self, fields):
+        """
+        Splits ``fields`` into the names of the fields to search with the
+        full-text search of the backend, and the fields to match with the
+        lookups of their ``^`` or ``=`` prefix.
+        """
+        text_fields = []
+        lookup_fields = []
+        for field in fields:
+            name, lookup = parse_search_field(field)
+            if lookup is None or lookup == 'search':
+                text_fields.append(name)
+            else:
+                lookup_fields.append(field)
+        return text_fields, lookup_fields
+
+
+class ContainsSearchBackend(SearchBackend):
+    """
+    Ors together ``__contains`` or ``__icontains`` lookups on every field.
+    Works on every database, but can't use the indexes of the fields.
+
+    Fields prefixed with ``^`` use ``__startswith``, with ``=`` use
+    ``__exact`` and with ``@`` use the ``__search`` lookup of PostgreSQL,
+    like ``search_fields`` in the Django admin.
+    """
+    def get_filter(self, fields, query, case_sensitive=False):
+        return self.get_lookup_filter(fields, query, case_sensitive)
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    Uses the full-text search of PostgreSQL.  The ``SearchVector`` of the
+    fields is computed for every row, unless ``vector_field`` names a
+    ``SearchVectorField`` of the model that stores it, in which case the
+    fields aren't used.
+
+    Fields prefixed with ``^`` or ``=`` are matched with ``__startswith`` or
+    ``__exact`` instead.
+    """
+    def __init__(self, config=None, search_type='plain', vector_field=None):
+        self.config = config
+        self.search_type = search_type
+        self.vector_field = vector_field
+
+    def get_filter(self, fields, query, case_sensitive=False):
+        from django.contrib.postgres.search import SearchQuery, SearchVector, SearchVectorExact
+
+        text_fields, lookup_fields = self.split_fields(fields)
+        condition = self.get_lookup_filter(lookup_fields, query, case_sensitive)
+        search_query = SearchQuery(query, config=self.config, search_type=self.search_type)
+        if self.vector_field is not None:
+            condition |= Q(**{self.vector_field: search_query})
+        elif text_fields:
+            condition |= Q(SearchVectorExact(SearchVector(*text_fields, config=self.config), search_query))
+        return condition
+
+
+def quote_fts5_string(value):
+    return '"{0}"'.format(value.replace('"', '""'))
+
+
+class SQLiteFTS5SearchBackend(SearchBackend):
+    """
+    Uses an SQLite FTS5 virtual table named ``table``, whose rowid is the
+    primary key of the model and whose columns are named after the search
+    fields, usually an external content table of the model's table.  Keeping
+    it up to date is left to the project.
+
+    Every word of the query has to be the prefix of a word in one of the
+    fields.  Fields prefixed with ``^`` or ``=`` are matched with
+    ``__startswith`` or ``__exact`` instead, and don't need a column.
+    """
+    def __init__(self, table):
+        self.table = table
+
+    def get_match_expression(self, fields, query):
+        terms = ' '.join(quote_fts5_string(term) + '*' for term in query.split())
+        return '{{{0}}} : ({1})'.format(' '.join(fields), terms)
+
+    def get_filter(self, fields, query, case_sensitive=False):
+        text_fields, lookup_fields = self.split_fields(fields)
+        condition = self.get_lookup_filter(lookup_fields, query, case_sensitive)
+        if text_fields:
+            sql = 'SELECT rowid FROM {0} WHERE {0} MATCH %s'.format(quote_fts5_string(self.table))
+            condition |= Q(pk__in=RawSQL(sql, [self.get_match_expression(text_fields, query)]))
+        return condition
@@ -0,0 +1,19 @@
+from django.dispatch import Signal
+
+# Sent after ``as_p()`` renders a form.  The sender is the form class, the
+# arguments are ``form``, ``duration`` (in seconds), ``fields`` (the number
+# of bound fields rendered) and ``includes`` (the number of field and
+# fieldset templates rendered).
+form_rendered = Signal()
+
+# Sent after a fieldset is rendered, either with ``str(fieldset)`` or as part
+# of a form rendered with a render plan.  The sender is the form class, the
+# arguments are ``form``, ``fieldset`` (the ``BoundFieldset``), ``duration``,
+# ``fields`` and ``includes``.
+fieldset_rendered = Signal()
+
+# Sent after a child form of a ``MultiForm`` is validated.  The sender is the
+# ``MultiForm`` class, the arguments are ``multiform``, ``key``, ``form``,
+# ``duration`` and ``is_valid``.  With a ``validation_executor``, it is sent
+# from the thread that validated the form.
+child_form_validated = Signal()
@@ -1,22 +1,39 @@
+import copy
+import datetime
+import os
+import pickle
+import shutil
+import sys
+import tempfile
 import unittest  # NOQA
 
 from unittest import mock
 
 import django
 from django import forms
+from django.core import signing
+from django.core.cache import caches
 from django.core.exceptions import ImproperlyConfigured
 from django.conf import settings
-from django.db import models
-from django.test import TestCase
+from django.db import connection, models
+from django.db.models import Q
+from django.test import TestCase, override_settings
+from django.forms.renderers import DjangoTemplates
 from django.template.loader import render_to_string
 from django.http import QueryDict
+from django.utils import translation
+from django.utils.http import urlencode
 
 from betterforms.changelist import (
-    BaseChangeListForm, SearchForm, SortForm, HeaderSet, Header, BoundHeader
+    BaseChangeListForm, SearchForm, SortForm, HeaderSet, Header, BoundHeader,
+    construct_querystring,
 )
 from betterforms.forms import (
     BetterForm, BetterModelForm, Fieldset, BoundFieldset, flatten_to_tuple,
+    get_value_fingerprint,
 )
+from betterforms.search import ContainsSearchBackend, PostgresSearchBackend, SearchBackend, SQLiteFTS5SearchBackend
+from betterforms.signals import fieldset_rendered, form_rendered
 
 
 class TestUtils(TestCase):
@@ -30,6 +47,19 @@ class TestUtils(TestCase):
         fields3 = ('a', ('b', 'c'), 'd', ('e', ('f', 'g', ('h',)), 'i'))
         self.assertTupleEqual(flatten_to_tuple(fields3), ('a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i'))
 
+        fields4 = ((), 'a', [(), ['b']], ('c',), ())
+        self.assertTupleEqual(flatten_to_tuple(fields4), ('a', 'b', 'c'))
+
+    def test_flatten_deep_tree(self):
+        depth = sys.getrecursionlimit() * 2
+        fields = ('leaf',)
+        for i in range(depth):
+            fields = ('field_{0}'.format(i), fields)
+        flattened = flatten_to_tuple(fields)
+        self.assertEqual(len(flattened), depth + 1)
+        self.assertEqual(flattened[0], 'field_{0}'.format(depth - 1))
+        self.assertEqual(flattened[-1], 'leaf')
+
 
 class TestFieldSets(TestCase):
     def test_basic_fieldset(self):
@@ -67,6 +97,66 @@ class TestFieldSets(TestCase):
         fieldset = Fieldset('the_name', fields=fields)
         self.assertTupleEqual(fieldset.fields, ('a', 'b', 'c'))
 
+    def test_precomputed_fields_and_paths(self):
+        fields = ('a', ('sub_name', {'fields': ('b', ('c', 'd'))}), 'e')
+        fieldset = Fieldset('the_name', fields=fields)
+        self.assertIs(fieldset.fields, fieldset.fields)
+        self.assertTupleEqual(fieldset.fields, ('a', 'b', 'c', 'd', 'e'))
+        self.assertEqual(dict(fieldset.paths), {
+            'a': (),
+            'sub_name': (),
+            'b': ('sub_name',),
+            'sub_name_1': ('sub_name',),
+            'c': ('sub_name', 'sub_name_1'),
+            'd': ('sub_name', 'sub_name_1'),
+            'e': (),
+        })
+        self.assertEqual(fieldset.fieldset_names, {'sub_name', 'sub_name_1'})
+
+    def test_name_conflicts_reported_once_for_the_tree(self):
+        fields = (('first', {'fields': ('a', 'a')}), ('second', {'fields': ('b',)}), 'b')
+        with self.assertRaisesRegex(AttributeError, r"fieldset `the_name`.*\['a', 'b'\]"):
+            Fieldset('the_name', fields=fields)
+
+    def test_nested_paths_share_parent_paths(self):
+        fieldset = Fieldset('the_name', fields=('a', ('sub', {'fields': ('b', 'c')})))
+        self.assertIs(fieldset.paths['b'], fieldset.paths['c'])
+        sub = fieldset.base_fields[1]
+        self.assertEqual(dict(sub.paths), {'b': (), 'c': ()})
+        self.assertTupleEqual(sub.fields, ('b', 'c'))
+        with self.assertRaises(AttributeError):
+            sub.fields = ('d',)
+
+    def test_fieldset_is_frozen(self):
+        fieldset = Fieldset('the_name', fields=('a', 'b'))
+        with self.assertRaises(AttributeError):
+            fieldset.base_fields = ('c',)
+        with self.assertRaises(AttributeError):
+            fieldset.fields = ('c',)
+        self.assertTupleEqual(fieldset.fields, ('a', 'b'))
+
+    def test_fieldset_copy_and_pickle(self):
+        fieldset = Fieldset('the_name', fields=('a', ('sub', {'fields': ['b']})), legend='Legend')
+        for copied in (copy.copy(fieldset), copy.deepcopy(fieldset), pickle.loads(pickle.dumps(fieldset))):
+            self.assertEqual(copied.name, 'the_name')
+            self.assertEqual(copied.legend, 'Legend')
+            self.assertTupleEqual(copied.fields, ('a', 'b'))
+            self.assertEqual(dict(copied.paths), {'a': (), 'sub': (), 'b': ('sub',)})
+            with self.assertRaises(AttributeError):
+                copied.fields = ('c',)
+
+    def test_rendered_form_deepcopy(self):
+        class TestForm(BetterForm):
+            a = forms.CharField()
+            b = forms.CharField()
+
+            class Meta:
+                fieldsets = (('first', {'fields': ('a', 'b')}),)
+
+        form = TestForm({'a': 'foo'})
+        html = form.as_p()
+        self.assertEqual(copy.deepcopy(form).as_p(), html)
+
     def test_nonzero_fieldset(self):
         fieldset1 = Fieldset('the_name', fields=[])
         self.assertFalse(fieldset1)
@@ -80,6 +170,25 @@ class TestFieldSets(TestCase):
         fieldset2 = Fieldset('the_name', fields=['a'], template_name='some_custom_template.html')
         self.assertEqual(fieldset2.template_name, 'some_custom_template.html')
 
+    def test_fieldset_uses_slots(self):
+        fieldset = Fieldset('the_name', fields=['a', ('sub', {'fields': ['b']})])
+        self.assertFalse(hasattr(fieldset, '__dict__'))
+        self.assertFalse(hasattr(fieldset.base_fields[1], '__dict__'))
+        self.assertIsNone(fieldset.css_classes)
+
+    def test_fieldset_rejects_undeclared_attributes(self):
+        with self.assertRaises(TypeError):
+            Fieldset('the_name', fields=['a'], description='Some text')
+
+        class DescribedFieldset(Fieldset):
+            __slots__ = ('description',)
+
+        fieldset = DescribedFieldset('the_name', fields=['a', ('sub', {'fields': ['b'], 'description': 'Sub'})], description='Some text')
+        self.assertEqual(fieldset.description, 'Some text')
+        self.assertEqual(fieldset.base_fields[1].description, 'Sub')
+        with self.assertRaises(AttributeError):
+            DescribedFieldset('other', fields=['a']).description
+
 
 class TestFieldsetDeclarationSyntax(TestCase):
     def test_admin_style_declaration(self):
@@ -155,6 +264,28 @@ class TestBetterForm(TestCase):
         # fieldset lookups
         self.assertEqual(form['first'].fieldset, form.fieldsets[0].fieldset)
         self.assertEqual(form['second'].fieldset, form.fieldsets[1].fieldset)
+        self.assertEqual(form['second'].fieldset, form.fieldsets[-1].fieldset)
+        self.assertEqual(form['b'].field, form.fieldsets[0][1].field)
+        self.assertEqual(form.fieldsets.row_names, ('first', 'second'))
+
+    def test_bound_fieldsets_are_memoized(self):
+        form = self.TestForm()
+        self.assertIs(form.fieldsets, form.fieldsets)
+        self.assertIs(form['first'], form.fieldsets['first'])
+        self.assertIs(form['first'], form.fieldsets[0])
+        self.assertSequenceEqual(list(form), list(form))
+
+    def test_bound_fieldsets_rebuilt_when_fields_change(self):
+        class TestForm(BetterForm):
+            a = forms.CharField()
+
+        form = TestForm()
+        fieldsets = form.fieldsets
+        self.assertEqual([field.name for field in fieldsets], ['a'])
+
+        form.fields['b'] = forms.CharField()
+        self.assertIsNot(form.fieldsets, fieldsets)
+        self.assertEqual([field.name for field in form.fieldsets], ['a', 'b'])
 
     def test_field_to_fieldset_name_conflict(self):
         with self.assertRaises(AttributeError):
@@ -174,6 +305,32 @@ class TestBetterForm(TestCase):
                         ('second', {'fields': ('c',)}),
                     )
 
+    def test_duplicate_name_in_nested_fieldsets(self):
+        with self.assertRaises(AttributeError):
+            class NameConflictForm(self.TestForm):
+                class Meta:
+                    fieldsets = (
+                        ('first', {'fields': ('a', ('inner', {'fields': ('b',)}))}),
+                        ('second', {'fields': ('c', ('b',))}),
+                    )
+
+        with self.assertRaises(AttributeError):
+            class FieldsetNameConflictForm(self.TestForm):
+                class Meta:
+                    fieldsets = (
+                        ('first', {'fields': ('a', ('inner', {'fields': ('b',)}))}),
+                        ('second', {'fields': (('inner', {'fields': ('c',)}),)}),
+                    )
+
+    def test_all_name_conflicts_are_reported(self):
+        with self.assertRaises(AttributeError) as context:
+            Fieldset('the_name', fields=(
+                ('first', {'fields': ('a', 'b')}),
+                ('second', {'fields': ('b', 'a', 'c')}),
+                'c',
+            ))
+        self.assertIn("['b', 'a', 'c']", str(context.exception))
+
     def test_field_error(self):
         data = {'a': 'a', 'b': 'b', 'c': 'c'}
         form = self.TestForm(data)
@@ -580,6 +737,499 @@ class TestFormRendering(TestCase):
             test,
         )
 
+    def test_render_plan_matches_templates(self):
+        class TestForm(BetterForm):
+            a = forms.CharField()
+            b = forms.BooleanField(help_text='Help <b>me</b>')
+            c = forms.CharField()
+
+            label_suffix = ''
+
+            class Meta:
+                fieldsets = (
+                    Fieldset('first', ('a', ('b', 'c')), legend='First & only'),
+                )
+
+        class TemplateForm(TestForm):
+            use_render_plan = False
+
+        form = TestForm()
+        form.field_error('first', 'fieldset error')
+        form.field_error('c', 'field error')
+        template_form = TemplateForm()
+        template_form.field_error('first', 'fieldset error')
+        template_form.field_error('c', 'field error')
+
+        self.assertHTMLEqual(form.as_p(), template_form.as_p())
+        self.assertHTMLEqual(str(form['first']), str(template_form['first']))
+
+    def test_render_plan_falls_back_to_overridden_templates(self):
+        class TestForm(BetterForm):
+            a = forms.CharField()
+
+            class Meta:
+                fieldsets = (Fieldset('first', ('a',)),)
+
+        template_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, template_dir)
+        os.mkdir(os.path.join(template_dir, 'betterforms'))
+        for name in ('form_as_p.html', 'fieldset_as_div.html'):
+            with open(os.path.join(template_dir, 'betterforms', name), 'w') as f:
+                f.write('overridden {0}'.format(name))
+
+        self.assertNotIn('overridden', TestForm().as_p())
+        templates = [dict(settings.TEMPLATES[0], DIRS=[template_dir])]
+        with override_settings(TEMPLATES=templates):
+            self.assertEqual(TestForm().as_p(), 'overridden form_as_p.html')
+            self.assertEqual(str(TestForm()['first']), 'overridden fieldset_as_div.html')
+        self.assertNotIn('overridden', TestForm().as_p())
+
+        # as_p() also falls back when a template it extends is overridden.
+        os.remove(os.path.join(template_dir, 'betterforms', 'form_as_p.html'))
+        with override_settings(TEMPLATES=templates):
+            self.assertIn('overridden fieldset_as_div.html', TestForm().as_p())
+        os.remove(os.path.join(template_dir, 'betterforms', 'fieldset_as_div.html'))
+        with open(os.path.join(template_dir, 'betterforms', 'form_as_fieldsets.html'), 'w') as f:
+            f.write('{% block form_head %}overridden head{% endblock %}{% block fieldsets %}{% endblock %}')
+        with override_settings(TEMPLATES=templates):
+            self.assertIn('overridden head', TestForm().as_p())
+
+    def test_render_plan_uses_bound_fieldset_css_classes(self):
+        class CustomBoundFieldset(BoundFieldset):
+            @property
+            def css_classes(self):
+                return super().css_classes + ' custom'
+
+        class TestForm(BetterForm):
+            a = forms.CharField()
+            bound_fieldset_class = CustomBoundFieldset
+
+            class Meta:
+                fieldsets = (Fieldset('first', ('a',)),)
+
+        class TemplateForm(TestForm):
+            use_render_plan = False
+
+        self.assertIn('custom', TestForm().as_p())
+        self.assertHTMLEqual(TestForm().as_p(), TemplateForm().as_p())
+
+    def test_static_fragments_match_templates(self):
+        class TestForm(BetterForm):
+            a = forms.CharField()
+            b = forms.BooleanField(help_text='Help <b>me</b>')
+            c = forms.CharField(widget=forms.HiddenInput)
+            d = forms.CharField(required=False)
+
+            label_suffix = ''
+
+            class Meta:
+                fieldsets = (
+                    Fieldset('first', ('a', ('b', 'c')), legend='First & only'),
+                    ('second', {'fields': ('d',), 'css_classes': ['extra']}),
+                )
+
+        class StaticForm(TestForm):
+            use_static_fragments = True
+
+        self.assertEqual(StaticForm().as_p(), TestForm().as_p())
+        self.assertEqual(str(StaticForm()['first']), str(TestForm()['first']))
+
+        data = {'a': 'x <y>', 'c': 'hidden', 'd': 'z'}
+        static_form = StaticForm(data)
+        self.assertFalse(static_form.is_valid())
+        static_form.field_error('first', 'fieldset error')
+        static_form.field_error('d', 'field error')
+        form = TestForm(data)
+        self.assertFalse(form.is_valid())
+        form.field_error('first', 'fieldset error')
+        form.field_error('d', 'field error')
+        self.assertEqual(static_form.as_p(), form.as_p())
+        self.assertEqual(str(static_form['second']), str(form['second']))
+
+    def test_static_fragments_are_cached_per_class_and_language(self):
+        class TestForm(BetterForm):
+            a = forms.CharField()
+            use_static_fragments = True
+
+            class Meta:
+                fieldsets = (
+                    ('first', {'fields': ('a',)}),
+                )
+
+        TestForm().as_p()
+        TestForm().as_p()
+        TestForm(prefix='other').as_p()
+        with translation.override('fr'):
+            html = TestForm().as_p()
+
+        self.assertIn('_static_fragments', TestForm.__dict__)
+        self.assertEqual(len(TestForm._static_fragments), 3)
+        self.assertNotEqual(html, TestForm().as_p())
+        with translation.override('fr'):
+            fragments = TestForm().get_static_fragments('betterforms/field_as_p.html')
+        self.assertIn(('a', False), fragments.fields)
+        self.assertIn(('first', False), fragments.fieldsets)
+
+    def test_static_fragments_cache_is_bounded(self):
+        class TestForm(BetterForm):
+            a = forms.CharField()
+            use_static_fragments = True
+            static_fragments_cache_size = 2
+
+            class Meta:
+                fieldsets = (
+                    ('first', {'fields': ('a',)}),
+                )
+
+        html = TestForm(prefix='one').as_p()
+        TestForm(prefix='two').as_p()
+        TestForm(prefix='one').as_p()
+        TestForm(prefix='three').as_p()
+
+        self.assertEqual(
+            [key[3] for key in TestForm._static_fragments],
+            ['one', 'three'],
+        )
+        self.assertEqual(html, TestForm(prefix='one').as_p())
+
+    def test_jinja2_templates_match_django_templates(self):
+        class TestForm(BetterForm):
+            a = forms.CharField()
+            b = forms.BooleanField(help_text='Help <b>me</b>')
+            c = forms.CharField(widget=forms.HiddenInput)
+            d = forms.CharField(required=False)
+
+            label_suffix = ''
+
+            class Meta:
+                fieldsets = (
+                    Fieldset('first', ('a', ('b', 'c')), legend='First & only'),
+                    ('second', {'fields': ('d',)}),
+                )
+
+        class JinjaForm(TestForm):
+            template_engine = 'jinja2'
+
+        class JinjaTemplateForm(JinjaForm):
+            use_render_plan = False
+
+        class JinjaStaticForm(JinjaForm):
+            use_static_fragments = True
+
+        data = {'a': 'x <y>', 'c': 'hidden'}
+        for jinja_class in (JinjaForm, JinjaTemplateForm, JinjaStaticForm):
+            for args in ((), (data,)):
+                form = TestForm(*args)
+                form.field_error('first', 'fieldset error')
+                jinja_form = jinja_class(*args)
+                jinja_form.field_error('first', 'fieldset error')
+                self.assertHTMLEqual(jinja_form.as_p(), form.as_p())
+                self.assertHTMLEqual(str(jinja_form['first']), str(form['first']))
+
+    def test_jinja2_templates_in_debug_mode(self):
+        class TestForm(BetterForm):
+            a = forms.CharField()
+            template_engine = 'jinja2'
+            use_render_plan = False
+
+            class Meta:
+                fieldsets = (('first', {'fields': ('a',)}),)
+
+        # Reloads the engines, whose undefined values print themselves when
+        # DEBUG is on.
+        with override_settings(DEBUG=True, TEMPLATES=settings.TEMPLATES):
+            html = TestForm().as_p()
+        self.assertNotIn('{{', html)
+        self.assertIn('name="a"', html)
+
+    def test_native_renderer_matches_templates(self):
+        class TestForm(BetterForm):
+            a = forms.CharField(label='A & B')
+            b = forms.BooleanField(help_text='Help <b>me</b>')
+            c = forms.CharField(widget=forms.HiddenInput)
+            d = forms.CharField(required=False, help_text='More & more')
+
+            class Meta:
+                fieldsets = (
+                    Fieldset('first', ('a', ('b', 'c')), legend='First & only'),
+                    ('second', {'fields': ('d',), 'css_classes': ['extra']}),
+                )
+
+        class NativeForm(TestForm):
+            fieldset_renderer = 'native'
+
+        class NoRequiredClassForm(TestForm):
+            required_css_class = ''
+
+        class NativeNoRequiredClassForm(NoRequiredClassForm):
+            fieldset_renderer = 'native'
+
+        data = {'a': 'x <y>', 'c': 'hidden'}
+        cases = (
+            (TestForm, NativeForm, {}),
+            (TestForm, NativeForm, {'data': data}),
+            (TestForm, NativeForm, {'prefix': 'pre'}),
+            (NoRequiredClassForm, NativeNoRequiredClassForm, {'data': data}),
+        )
+        for template_class, native_class, kwargs in cases:
+            form = template_class(**kwargs)
+            native_form = native_class(**kwargs)
+            if form.is_bound:
+                form.is_valid()
+                native_form.is_valid()
+            form.field_error('second', 'fieldset error')
+            native_form.field_error('second', 'fieldset error')
+            self.assertEqual(native_form.as_p(), form.as_p())
+            self.assertEqual(str(native_form['first']), str(form['first']))
+            self.assertEqual(str(native_form['second']), str(form['second']))
+
+    def test_native_renderer_falls_back_to_templates(self):
+        class TestForm(BetterForm):
+            a = forms.CharField()
+            fieldset_renderer = 'native'
+
+            class Meta:
+                fieldsets = (
+                    Fieldset('first', ('a',), template_name='noop.html'),
+                )
+
+        with mock.patch('betterforms.forms.NativeRenderer') as renderer:
+            TestForm().as_p()
+            str(TestForm()['first'])
+        self.assertFalse(renderer.called)
+
+        # Sanity check, the mock is used by forms without fieldset templates.
+        class NativeForm(BetterForm):
+            a = forms.CharField()
+            fieldset_renderer = 'native'
+
+            class Meta:
+                fieldsets = (
+                    Fieldset('first', ('a',)),
+                )
+
+        with mock.patch('betterforms.forms.NativeRenderer') as renderer:
+            renderer.return_value.render_field.return_value = ''
+            renderer.return_value.render_fieldset_start.return_value = ''
+            NativeForm().as_p()
+        self.assertTrue(renderer.called)
+
+    def test_render_signals(self):
+        class TestForm(BetterForm):
+            a = forms.CharField()
+            b = forms.CharField()
+            c = forms.CharField()
+
+            class Meta:
+                fieldsets = (
+                    ('first', {'fields': ('a', ('nested', {'fields': ('b',)}))}),
+                    ('second', {'fields': ('c',)}),
+                )
+
+        class TemplateForm(TestForm):
+            use_render_plan = False
+
+        class NativeForm(TestForm):
+            fieldset_renderer = 'native'
+
+        forms_rendered = []
+        fieldsets_rendered = []
+
+        def form_receiver(sender, form, duration, fields, includes, **kwargs):
+            self.assertGreaterEqual(duration, 0)
+            forms_rendered.append((sender, fields, includes))
+
+        def fieldset_receiver(sender, form, fieldset, duration, fields, includes, **kwargs):
+            self.assertGreaterEqual(duration, 0)
+            fieldsets_rendered.append((fieldset.name, fields, includes))
+
+        form_rendered.connect(form_receiver)
+        fieldset_rendered.connect(fieldset_receiver)
+        try:
+            TestForm().as_p()
+            self.assertEqual(forms_rendered, [(TestForm, 3, 3)])
+            self.assertEqual(fieldsets_rendered, [
+                ('nested', 1, 1), ('first', 2, 2), ('second', 1, 1),
+            ])
+            del forms_rendered[:], fieldsets_rendered[:]
+
+            str(TestForm()['first'])
+            self.assertEqual(fieldsets_rendered, [('nested', 1, 1), ('first', 2, 2)])
+            del fieldsets_rendered[:]
+
+            NativeForm().as_p()
+            self.assertEqual(forms_rendered, [(NativeForm, 3, 0)])
+            del forms_rendered[:], fieldsets_rendered[:]
+
+            # The templates include every item of every fieldset.
+            TemplateForm().as_p()
+            self.assertEqual(forms_rendered, [(TemplateForm, 3, 6)])
+            self.assertEqual(fieldsets_rendered, [])
+            str(TemplateForm()['first'])
+            self.assertEqual(fieldsets_rendered, [('first', 2, 3)])
+        finally:
+            form_rendered.disconnect(form_receiver)
+            fieldset_rendered.disconnect(fieldset_receiver)
+
+    def test_iter_render(self):
+        form = self.TestForm({'a': 'x'})
+        form.is_valid()
+        chunks = list(form.iter_render())
+        # The media, the non field errors, and a chunk for each fieldset tag
+        # and field.
+        self.assertEqual(len(chunks), 9)
+        self.assertEqual(''.join(chunks), form.as_p())
+
+        chunks = list(form['first'].iter_render())
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(''.join(chunks), str(form['first']))
+
+        class TemplateForm(self.TestForm):
+            template_name = 'betterforms/form_as_p.html'
+
+        form = TemplateForm()
+        self.assertEqual(list(form.iter_render()), [form.as_p()])
+
+    def test_render_cache(self):
+        class TestForm(BetterForm):
+            a = forms.CharField()
+            render_cache_alias = 'default'
+
+            class Meta:
+                fieldsets = (
+                    ('first', {'fields': ('a',)}),
+                )
+        caches['default'].clear()
+        stats = TestForm.get_render_cache_stats()
+
+        html = TestForm().as_p()
+        self.assertEqual(stats, {'hits': 0, 'misses': 1})
+        self.assertEqual(TestForm().as_p(), html)
+        self.assertEqual(str(TestForm()['first']), str(TestForm()['first']))
+        self.assertEqual(stats, {'hits': 2, 'misses': 2})
+
+        self.assertIn('value="b"', TestForm(initial={'a': 'b'}).as_p())
+        self.assertIn('other-a', TestForm(prefix='other').as_p())
+        self.assertEqual(stats, {'hits': 2, 'misses': 4})
+
+        # Bound forms, forms with errors and forms with callable initial
+        # values aren't cached.
+        self.assertIn('value="c"', TestForm({'a': 'c'}).as_p())
+        form = TestForm()
+        form.field_error('a', 'error')
+        self.assertIn('error', form.as_p())
+        values = iter(['d', 'e'])
+        self.assertIn('value="d"', TestForm(initial={'a': lambda: next(values)}).as_p())
+        self.assertIn('value="e"', TestForm(initial={'a': lambda: next(values)}).as_p())
+        self.assertEqual(stats, {'hits': 2, 'misses': 4})
+
+        self.assertIn('name="a" required', html)
+        self.assertIn('name="a" id="id_a"', TestForm(use_required_attribute=False).as_p())
+        self.assertEqual(stats, {'hits': 2, 'misses': 5})
+
+        class OtherRenderer(DjangoTemplates):
+            pass
+        self.assertEqual(TestForm(renderer=OtherRenderer()).as_p(), html)
+        self.assertEqual(stats, {'hits': 2, 'misses': 6})
+
+    def test_render_cache_key_includes_fields(self):
+        class TestForm(BetterForm):
+            a = forms.ChoiceField(choices=[('x', 'X')])
+            b = forms.ModelMultipleChoiceField(queryset=ChangeListModel.objects.all(), required=False)
+            render_cache_alias = 'default'
+
+            class Meta:
+                fieldsets = (
+                    ('first', {'fields': ('a', 'b')}),
+                )
+
+            def __init__(self, *args, owner=None, **kwargs):
+                super().__init__(*args, **kwargs)
+                if owner is not None:
+                    self.fields['a'].choices = [(owner, owner)]
+                    self.fields['a'].required = False
+                    self.fields['b'].queryset = ChangeListModel.objects.filter(field_a=owner)
+
+        caches['default'].clear()
+        mine = ChangeListModel.objects.create(field_a='mine')
+        ChangeListModel.objects.create(field_a='theirs')
+
+        self.assertIn('value="x"', TestForm().as_p())
+        html = TestForm(owner='mine').as_p()
+        self.assertNotIn('value="x"', html)
+        self.assertIn('value="mine"', html)
+        self.assertIn('value="{0}"'.format(mine.pk), html)
+        self.assertNotIn('theirs', html)
+        self.assertNotIn('mine', TestForm(owner='theirs').as_p())
+
+        # Querysets in the initial data aren't evaluated to build the key.
+        initial = {'b': ChangeListModel.objects.filter(field_a='mine')}
+        html = TestForm(initial=initial).as_p()
+        with self.assertNumQueries(0):
+            self.assertEqual(TestForm(initial=initial).as_p(), html)
+
+    def test_queryset_fingerprint_keeps_params_apart(self):
+        self.assertNotEqual(
+            get_value_fingerprint(ChangeListModel.objects.filter(field_a__in=['a, b'])),
+            get_value_fingerprint(ChangeListModel.objects.filter(field_a__in=['a', 'b'])),
+        )
+
+    def test_render_plan_is_cached_on_fieldset(self):
+        plan = self.TestForm().get_render_plan()
+        self.assertEqual(
+            [step for step, node in plan],
+            ['fieldset_start', 'field', 'field', 'fieldset_end',
+             'fieldset_start', 'field', 'fieldset_end'],
+        )
+        self.assertIs(self.TestForm().get_render_plan(), plan)
+        self.assertIs(self.TestForm.base_fieldsets.render_plan, plan)
+
+    def test_render_plan_of_instance_fieldsets(self):
+        class TestForm(BetterForm):
+            a = forms.CharField()
+            b = forms.CharField()
+
+            class Meta:
+                fieldsets = (('one', {'fields': ('a', 'b')}),)
+
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.base_fieldsets = Fieldset('__base_fieldset__', fields=(
+                    ('two', {'fields': ('b',)}),
+                    ('three', {'fields': ('a',)}),
+                ))
+
+        class TemplateForm(TestForm):
+            use_render_plan = False
+
+        form = TestForm()
+        html = form.as_p()
+        self.assertRegex(html, r'<fieldset class="[^"]*\btwo\b')
+        self.assertNotRegex(html, r'<fieldset class="[^"]*\bone\b')
+        self.assertHTMLEqual(html, TemplateForm().as_p())
+        self.assertEqual([fieldset.name for fieldset in form.fieldsets], ['two', 'three'])
+
+        # The bound fieldsets follow a change of base_fieldsets.
+        form.base_fieldsets = TestForm.base_fieldsets
+        self.assertEqual([fieldset.name for fieldset in form.fieldsets], ['one'])
+
+    def test_render_plan_falls_back_to_templates(self):
+        class TestForm(BetterForm):
+            a = forms.CharField()
+
+            class Meta:
+                fieldsets = (
+                    Fieldset('first', ('a',), template_name='noop.html'),
+                )
+        self.assertIsNone(TestForm().get_render_plan())
+
+        class BareFieldsForm(BetterForm):
+            a = forms.CharField()
+
+            class Meta:
+                fieldsets = ('a',)
+        self.assertIsNone(BareFieldsForm().get_render_plan())
+
     def test_css_classes_when_form_has_prefix(self):
         class TestForm(BetterForm):
             name = forms.CharField()
@@ -606,6 +1256,18 @@ class ChangeListModel(models.Model):
     field_c = models.TextField(max_length=255)
 
 
+class KeysetCategory(models.Model):
+    name = models.CharField(max_length=255)
+
+    class Meta:
+        ordering = ('-name',)
+
+
+class KeysetEvent(models.Model):
+    category = models.ForeignKey(KeysetCategory, on_delete=models.CASCADE)
+    starts_at = models.DateTimeField()
+
+
 class TestChangleListQuerySetAPI(TestCase):
     def setUp(self):
         class TestChangeListForm(BaseChangeListForm):
@@ -746,6 +1408,145 @@ class TestSearchFormAPI(TestCase):
         self.assertIn(upper_cased, form.get_queryset())
         self.assertNotIn(lower_cased, form.get_queryset())
 
+    def test_search_backend(self):
+        class TheSearchForm(SearchForm):
+            SEARCH_FIELDS = ('field_a', 'field_b')
+            model = ChangeListModel
+
+        backend = mock.Mock(spec=SearchBackend)
+        backend.get_filter.return_value = Q(field_a='bar')
+        form = TheSearchForm({'q': ' foo '}, search_backend=backend)
+        form.full_clean()
+
+        self.assertEqual(list(form.get_queryset().values_list('field_b', flat=True)), ['baz'])
+        backend.get_filter.assert_called_once_with(('field_a', 'field_b'), 'foo', False)
+
+    def test_tokenized_search(self):
+        class TheSearchForm(SearchForm):
+            SEARCH_FIELDS = ('field_a', 'field_b', 'field_c')
+            TOKENIZE_QUERY = True
+            model = ChangeListModel
+
+        ChangeListModel.objects.create(field_a='john smith', field_b='j@example.com')
+        ChangeListModel.objects.create(field_a='smith', field_b='john@example.com')
+        ChangeListModel.objects.create(field_a='a:b')
+
+        def search(q):
+            form = TheSearchForm({'q': q})
+            form.full_clean()
+            return sorted(form.get_queryset().values_list('field_a', flat=True))
+
+        # Every term has to match a field, but not the same one.
+        self.assertEqual(search('john smith'), ['john smith', 'smith'])
+        self.assertEqual(search('"john smith"'), ['john smith'])
+        self.assertEqual(search('smith field_b:john'), ['smith'])
+        self.assertEqual(search('field_a:"john smith" example'), ['john smith'])
+        self.assertEqual(search('foo field_c:bar'), [])
+        # Unknown prefixes are part of the term.
+        self.assertEqual(search('a:b'), ['a:b'])
+
+    def test_search_terms(self):
+        class TheSearchForm(SearchForm):
+            SEARCH_FIELDS = ('field_a', 'field_b')
+            model = ChangeListModel
+
+        form = TheSearchForm({})
+        self.assertEqual(form.get_search_terms('foo field_b:bar'), [(('field_a', 'field_b'), 'foo field_b:bar')])
+
+        form.TOKENIZE_QUERY = True
+        self.assertEqual(form.get_search_terms('foo field_b:bar field_c:"baz qux"'), [
+            (('field_a', 'field_b'), 'foo'),
+            (('field_b',), 'bar'),
+            (('field_a', 'field_b'), 'field_c:baz qux'),
+        ])
+
+    def test_lookup_prefixes(self):
+        class TheSearchForm(SearchForm):
+            SEARCH_FIELDS = ('^field_a', '=field_b', 'field_c')
+            TOKENIZE_QUERY = True
+            model = ChangeListModel
+
+        ChangeListModel.objects.create(field_a='Foobar', field_b='qux', field_c='abc')
+
+        def search(q):
+            form = TheSearchForm({'q': q})
+            form.full_clean()
+            return sorted(form.get_queryset().values_list('field_a', flat=True))
+
+        self.assertEqual(search('FOO'), ['Foobar', 'foo'])
+        self.assertEqual(search('oba'), [])
+        self.assertEqual(search('ba'), ['bar', 'baz', 'foo'])
+        self.assertEqual(search('Qux'), ['Foobar'])
+        self.assertEqual(search('qu'), [])
+        self.assertEqual(search('b'), ['Foobar', 'bar', 'baz', 'foo'])
+        self.assertEqual(search('field_b:baz'), ['bar'])
+        self.assertEqual(search('field_a:baz'), ['baz'])
+
+    def test_lookup_prefix_filters(self):
+        backend = ContainsSearchBackend()
+        self.assertEqual(
+            backend.get_filter(('^a', '=b', '@c', 'd'), 'foo'),
+            Q(a__istartswith='foo') | Q(b__iexact='foo') | Q(c__search='foo') | Q(d__icontains='foo'),
+        )
+        self.assertEqual(
+            backend.get_filter(('^a', '=b'), 'foo', case_sensitive=True),
+            Q(a__startswith='foo') | Q(b__exact='foo'),
+        )
+
+    def test_sqlite_fts5_search_backend(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('FTS5 is only available on SQLite.')
+
+        class TheSearchForm(SearchForm):
+            SEARCH_FIELDS = ('field_a', 'field_c')
+            SEARCH_BACKEND = SQLiteFTS5SearchBackend('changelist_fts')
+            model = ChangeListModel
+
+        ChangeListModel.objects.create(field_a='foo bar', field_c='qux')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE changelist_fts USING fts5(field_a, field_b, field_c,"
+                " content='betterforms_changelistmodel', content_rowid='id')"
+            )
+            cursor.execute("INSERT INTO changelist_fts(changelist_fts) VALUES ('rebuild')")
+
+        def drop_table():
+            # Rolling back the test transaction leaves the FTS5 shadow tables
+            # in a broken state.
+            with connection.cursor() as cursor:
+                cursor.execute('DROP TABLE changelist_fts')
+        self.addCleanup(drop_table)
+
+        def search(q):
+            form = TheSearchForm({'q': q})
+            form.full_clean()
+            return sorted(form.get_queryset().values_list('field_a', flat=True))
+
+        self.assertEqual(search('ba'), ['bar', 'baz', 'foo', 'foo bar'])
+        # Words are prefixes, and every one of them has to match a field.
+        self.assertEqual(search('fo qu'), ['foo bar'])
+        self.assertEqual(search('foo zzz'), [])
+        # field_b isn't searched.
+        self.assertEqual(search('baz'), ['baz', 'foo'])
+        self.assertEqual(search('"'), [])
+
+        # Fields with a lookup prefix don't need a column.
+        TheSearchForm.SEARCH_FIELDS = ('field_a', '=field_c')
+        self.assertEqual(search('QUX'), ['foo bar'])
+        self.assertEqual(search('qu'), [])
+        self.assertEqual(search('ba'), ['bar', 'baz', 'foo bar'])
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Full-text search is only available on PostgreSQL.')
+    def test_postgres_search_backend(self):
+        class TheSearchForm(SearchForm):
+            SEARCH_FIELDS = ('field_a', 'field_c')
+            SEARCH_BACKEND = PostgresSearchBackend(config='english')
+            model = ChangeListModel
+
+        form = TheSearchForm({'q': 'baz'})
+        form.full_clean()
+        self.assertEqual(sorted(form.get_queryset().values_list('field_a', flat=True)), ['baz', 'foo'])
+
 
 class TestHeaderAPI(TestCase):
     def test_header_bare_declaration(self):
@@ -771,6 +1572,8 @@ class TestHeaderAPI(TestCase):
         header = Header('field_a', is_sortable=False)
 
         self.assertFalse(header.is_sortable)
+        self.assertIsNone(header.column_name)
+        self.assertFalse(hasattr(header, '__dict__'))
 
 
 class TestHeaderSetAPI(TestCase):
@@ -881,6 +1684,9 @@ class TestHeaderSetAPI(TestCase):
         self.assertIsInstance(header_set['field_b'], BoundHeader)
         self.assertEqual(header_set['field_b'].header, HEADERS[1])
 
+        self.assertEqual(header_set[-1].header, HEADERS[3])
+        self.assertSequenceEqual(header_set.header_list, HEADERS)
+
 
 class TestBoundHeaderAPI(TestCase):
     def setUp(self):
@@ -993,6 +1799,23 @@ class TestBoundHeaderAPI(TestCase):
         self.assertEqual(header_set['field_b'].css_classes, 'active descending')
         self.assertEqual(header_set['field_c'].css_classes, '')
 
+    def test_header_set_provides_positions_and_sort_states(self):
+        HEADERS = (
+            Header('field_a'),
+            Header('field_b'),
+            Header('field_c'),
+        )
+        self.form.cleaned_data = {'sorts': [3, -1]}
+        # The positions come from the header set, HEADERS is never searched.
+        self.form.HEADERS = None
+        header_set = HeaderSet(self.form, HEADERS)
+
+        self.assertEqual([header._sort_index for header in header_set], [1, 2, 3])
+        self.assertEqual([header.priority for header in header_set], [2, None, 1])
+        self.assertEqual(header_set[-1].css_classes, 'active ascending')
+        self.assertEqual(header_set['field_a'].css_classes, 'active descending')
+        self.assertIs(header_set[0].sort_states, header_set[2].sort_states)
+
     def test_bound_header_querystring_properties(self):
         HEADERS = (
             Header('field_a'),
@@ -1156,6 +1979,140 @@ class TestSortFormAPI(TestCase):
             (self.abc, self.aac, self.bca, self.cab),
         )
 
+    def test_keyset_pagination(self):
+        self.aac = ChangeListModel.objects.create(field_a='a', field_b='a', field_c='c')
+        self.bab = ChangeListModel.objects.create(field_a='b', field_b='a', field_c='b')
+
+        for sorts in ('', '1', '-1', '1.-2', '-3.2'):
+            form = self.TestSortForm({'sorts': sorts})
+            self.assertTrue(form.is_valid())
+            expected = list(form.get_queryset().order_by(*(form.get_order_by() + ['pk'])))
+            results = []
+            data = {'sorts': sorts}
+            while True:
+                form = self.TestSortForm(data)
+                form.full_clean()
+                page = form.get_keyset_page(form.get_queryset(), 2)
+                self.assertEqual(page.has_previous(), bool(results))
+                results.extend(page)
+                if not page.has_next():
+                    break
+                data = QueryDict(page.next_querystring)
+            self.assertEqual(results, expected)
+
+    def test_keyset_cursor(self):
+        form = self.TestSortForm({'sorts': '1'})
+        form.full_clean()
+        page = form.get_keyset_page(form.get_queryset(), 1)
+        self.assertEqual(list(page), [self.abc])
+        self.assertEqual(form.decode_cursor(page.next_cursor), ['a', self.abc.pk])
+        self.assertEqual(page.next_querystring, 'sorts=1&' + urlencode({'cursor': page.next_cursor}))
+        self.assertEqual(page.first_querystring, 'sorts=1')
+
+        # Changing the sorts drops the cursor.
+        form = self.TestSortForm({'sorts': '1', 'cursor': page.next_cursor})
+        form.full_clean()
+        self.assertEqual(form.headers[1].querystring, 'sorts=2.1')
+        self.assertEqual(list(form.get_keyset_page(form.get_queryset(), 1)), [self.bca])
+
+        # A cursor made for other sorts starts from the first page.
+        form = self.TestSortForm({'sorts': '-1', 'cursor': page.next_cursor})
+        form.full_clean()
+        self.assertEqual(list(form.get_keyset_page(form.get_queryset(), 1)), [self.cab])
+
+        form = self.TestSortForm({'sorts': '1', 'cursor': page.next_cursor[:-1]})
+        form.full_clean()
+        with self.assertRaises(signing.BadSignature):
+            form.get_keyset_page(form.get_queryset(), 1)
+
+    def paginate_keyset(self, form_class, data, page_size):
+        results = []
+        # Bounded, so that a cursor that doesn't move forward fails the test
+        # instead of looping forever.
+        for _ in range(10):
+            form = form_class(data)
+            form.full_clean()
+            page = form.get_keyset_page(form.get_queryset(), page_size)
+            results.extend(page)
+            if not page.has_next():
+                return results
+            data = QueryDict(page.next_querystring)
+        self.fail('The keyset pagination did not end.')
+
+    def test_keyset_datetime_microseconds(self):
+        category = KeysetCategory.objects.create(name='a')
+        starts_at = datetime.datetime(2024, 1, 1, 12, 0, 0)
+        events = [
+            KeysetEvent.objects.create(category=category, starts_at=starts_at.replace(microsecond=microsecond))
+            for microsecond in (123999, 123456, 123789)
+        ]
+
+        class EventSortForm(SortForm):
+            model = KeysetEvent
+            HEADERS = (Header('starts_at'),)
+
+        self.assertEqual(
+            self.paginate_keyset(EventSortForm, {'sorts': '1'}, 1),
+            [events[1], events[2], events[0]],
+        )
+
+    def test_keyset_foreign_key_column(self):
+        # The pk order of the categories is the reverse of their ordering.
+        a = KeysetCategory.objects.create(name='a')
+        b = KeysetCategory.objects.create(name='b')
+        events = [
+            KeysetEvent.objects.create(category=category, starts_at=datetime.datetime(2024, 1, 1))
+            for category in (a, b, a)
+        ]
+
+        class EventSortForm(SortForm):
+            model = KeysetEvent
+            HEADERS = (Header('category'), Header('category_id'))
+
+        form = EventSortForm({'sorts': '1'})
+        form.full_clean()
+        self.assertEqual(form.get_keyset_ordering(KeysetEvent.objects.all()), [('category__name', True), ('pk', False)])
+        for sorts in ('1', '-1', '2', '-2'):
+            form = EventSortForm({'sorts': sorts})
+            form.full_clean()
+            self.assertEqual(
+                self.paginate_keyset(EventSortForm, {'sorts': sorts}, 1),
+                list(form.get_queryset().order_by(*form.get_order_by(), 'pk')),
+            )
+        self.assertEqual(
+            self.paginate_keyset(EventSortForm, {'sorts': '1'}, 1),
+            [events[1], events[0], events[2]],
+        )
+
+    def test_header_querystrings_share_base_encoding(self):
+        data = QueryDict('q=foo&sorts=2.-1&page=3&tag=a&tag=b%20c')
+        form = self.TestSortForm(data)
+        form.full_clean()
+
+        with mock.patch('betterforms.changelist.construct_querystring', wraps=construct_querystring) as patched:
+            querystrings = [
+                (header.querystring, header.singular_querystring, header.remove_querystring)
+                for header in form.headers
+            ]
+        self.assertEqual(patched.call_count, 1)
+
+        self.assertEqual(querystrings[0], (
+            'q=foo&sorts=1.2&page=3&tag=a&tag=b+c',
+            'q=foo&sorts=1&page=3&tag=a&tag=b+c',
+            'q=foo&sorts=2&page=3&tag=a&tag=b+c',
+        ))
+        for header, header_querystrings in zip(form.headers, querystrings):
+            self.assertEqual(
+                header_querystrings[0],
+                construct_querystring(data, sorts='.'.join(map(str, header.add_to_sorts()))),
+            )
+
+    def test_header_querystrings_with_prefix(self):
+        form = self.TestSortForm({'test-q': 'foo'}, prefix='test')
+        form.full_clean()
+        self.assertEqual(form.headers[0].querystring, 'test-q=foo&test-sorts=1')
+        self.assertEqual(form.headers[0].remove_querystring, 'test-q=foo&test-sorts=')
+
     def test_order_by_override(self):
         self.aac = ChangeListModel.objects.create(field_a='a', field_b='a', field_c='c')
         self.aab = ChangeListModel.objects.create(field_a='a', field_b='a', field_c='b')
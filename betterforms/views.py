@@ -1,10 +1,25 @@
+from asgiref.sync import sync_to_async
+from django.core import signing
+from django.core.exceptions import ImproperlyConfigured
+from django.http import Http404
 from django.views.generic import ListView, FormView
 
+from .pagination import CachedCountPaginator, EstimatedCountPaginator, NoCountPaginator
+
 
 class BrowseView(ListView, FormView):
     """
     Class Based view for working with changelists.
     """
+    # Paginate with the keyset cursors of the form instead of page numbers.
+    keyset_pagination = False
+    # How the paginator counts the results: 'exact', 'cached', 'estimate' or
+    # 'has_next'.
+    count_strategy = 'exact'
+    count_cache_alias = 'default'
+    count_cache_timeout = 60
+    count_estimate_threshold = 10000
+
     def post(self, *args, **kwargs):
         return self.http_method_not_allowed(*args, **kwargs)
 
@@ -20,10 +35,75 @@ class BrowseView(ListView, FormView):
     def get_context_data(self, **kwargs):
         form_class = self.get_form_class()
         form = self.get_form(form_class)
+        self.form = form
         kwargs['form'] = form
-        if form.is_valid():
+        if self.is_form_valid(form):
             kwargs['object_list'] = form.get_queryset()
         else:
             kwargs['object_list'] = form.base_queryset.none()
         kwargs = super().get_context_data(**kwargs)
         return kwargs
+
+    def is_form_valid(self, form):
+        return form.is_valid()
+
+    def get_paginator(self, queryset, per_page, orphans=0, allow_empty_first_page=True, **kwargs):
+        strategy = self.count_strategy
+        if strategy == 'cached':
+            paginator_class = CachedCountPaginator
+            kwargs.update(cache_alias=self.count_cache_alias, timeout=self.count_cache_timeout)
+        elif strategy == 'estimate':
+            paginator_class = EstimatedCountPaginator
+            kwargs.update(exact_threshold=self.count_estimate_threshold)
+        elif strategy == 'has_next':
+            paginator_class = NoCountPaginator
+        elif strategy == 'exact':
+            paginator_class = self.paginator_class
+        else:
+            raise ImproperlyConfigured('Unknown count strategy `{0}`.'.format(strategy))
+        return paginator_class(
+            queryset, per_page, orphans=orphans,
+            allow_empty_first_page=allow_empty_first_page, **kwargs
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.keyset_pagination:
+            return super().paginate_queryset(queryset, page_size)
+        try:
+            page = self.form.get_keyset_page(queryset, page_size)
+        except signing.BadSignature:
+            raise Http404('Invalid cursor')
+        return (None, page, page.object_list, page.has_other_pages())
+
+
+class AsyncBrowseView(BrowseView):
+    """
+    Async version of ``BrowseView``.  The form is validated with
+    ``ais_valid`` when it provides one, the rest of the request is handled
+    like ``BrowseView`` does, in a thread.
+    """
+    form = None
+    form_valid = None
+
+    async def get(self, request, *args, **kwargs):
+        if hasattr(self.get_form_class(), 'ais_valid'):
+            self.object_list = self.get_queryset()
+            self.form = self.get_form()
+            self.form_valid = await self.form.ais_valid()
+        return await sync_to_async(super().get)(request, *args, **kwargs)
+
+    async def post(self, *args, **kwargs):
+        return await self.http_method_not_allowed(*args, **kwargs)
+
+    async def put(self, *args, **kwargs):
+        return await self.http_method_not_allowed(*args, **kwargs)
+
+    def get_form(self, form_class=None):
+        if self.form is not None:
+            return self.form
+        return super().get_form(form_class)
+
+    def is_form_valid(self, form):
+        if self.form_valid is not None:
+            return self.form_valid
+        return super().is_form_valid(form)
@@ -1,13 +1,16 @@
+import threading
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 from django import forms
 from django.forms.models import inlineformset_factory
 from django.contrib.admin import widgets as admin_widgets
 from django.core.exceptions import ValidationError
 
+from betterforms.changelist import Header, SearchForm, SortForm
 from betterforms.multiform import MultiForm, MultiModelForm
 
-from .models import User, Profile, Badge, Author, Book, BookImage
+from .models import User, Profile, Badge, Author, Book, BookImage, SpecialBadge
 
 
 class UserForm(forms.ModelForm):
@@ -49,6 +52,27 @@ class ErrorMultiForm(MultiForm):
     }
 
 
+class ThreadedErrorMultiForm(ErrorMultiForm):
+    validation_executor = ThreadPoolExecutor(max_workers=2)
+
+
+class RecordsThreadForm(forms.Form):
+    name = forms.CharField()
+
+    def clean(self):
+        self.validation_thread = threading.current_thread()
+        return super().clean()
+
+
+class ThreadedMultiForm(MultiForm):
+    validation_executor = ThreadPoolExecutor(max_workers=2)
+    form_classes = OrderedDict((
+        ('first', RecordsThreadForm),
+        ('second', RecordsThreadForm),
+        ('errors', RaisesErrorForm),
+    ))
+
+
 class FileForm(forms.Form):
     # we use this widget to test the media property
     date = forms.DateTimeField(widget=admin_widgets.AdminSplitDateTime)
@@ -76,6 +100,24 @@ class BadgeMultiForm(MultiModelForm):
     }
 
 
+class BulkBadgeMultiForm(BadgeMultiForm):
+    bulk_save = True
+
+
+class SpecialBadgeForm(forms.ModelForm):
+    class Meta:
+        model = SpecialBadge
+        fields = ('name', 'color', 'level')
+
+
+class BulkSpecialBadgeMultiForm(MultiModelForm):
+    bulk_save = True
+    form_classes = {
+        'badge': BadgeForm,
+        'special': SpecialBadgeForm,
+    }
+
+
 class NonModelForm(forms.Form):
     field1 = forms.CharField()
 
@@ -100,6 +142,10 @@ class ManyToManyMultiForm(MultiModelForm):
     }
 
 
+class BulkManyToManyMultiForm(ManyToManyMultiForm):
+    bulk_save = True
+
+
 class OptionalFileForm(forms.Form):
     myfile = forms.FileField(required=False)
 
@@ -145,6 +191,10 @@ class BookMultiForm(MultiModelForm):
         super().__init__(*args, **kwargs)
 
 
+class BulkBookMultiForm(BookMultiForm):
+    bulk_save = True
+
+
 class RaisesErrorBookMultiForm(BookMultiForm):
     form_classes = {
         'book': BookForm,
@@ -205,3 +255,13 @@ class OuterMultiForm(MultiForm):
     form_classes = {
         'foo4': InnerMultiform,
     }
+
+
+class UserSearchForm(SearchForm):
+    SEARCH_FIELDS = ('name',)
+    model = User
+
+
+class UserSortForm(SortForm):
+    HEADERS = (Header('name'),)
+    model = User
@@ -18,6 +18,10 @@ class Badge(models.Model):
     color = models.CharField(max_length=20)
 
 
+class SpecialBadge(Badge):
+    level = models.CharField(max_length=20)
+
+
 class Author(models.Model):
     name = models.CharField(max_length=255)
     books = models.ManyToManyField('Book', related_name='authors')
@@ -1,5 +1,12 @@
+import threading
 from collections import OrderedDict
+from concurrent.futures import Executor, Future
+from unittest import mock
 
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.http import Http404
 from django.test import TestCase
 from django.test.client import RequestFactory
 from django.views.generic import CreateView
@@ -10,12 +17,19 @@ except ImportError:
     from django.utils.encoding import force_text as force_str
 from django.urls import reverse
 
-from .models import User, Profile, Badge, Book
+from betterforms.pagination import CachedCountPaginator, get_count_cache_key
+from betterforms.signals import child_form_validated
+from betterforms.views import AsyncBrowseView, BrowseView
+
+from .models import User, Profile, Badge, Book, BookImage, SpecialBadge
 from .forms import (
     UserProfileMultiForm, BadgeMultiForm, ErrorMultiForm, MixedForm,
     NeedsFileField, ManyToManyMultiForm, RaisesErrorBookMultiForm,
     CleanedBookMultiForm, BookMultiForm, RaisesErrorCustomCleanMultiform,
-    ModifiesDataCustomCleanMultiform, OuterMultiForm
+    ModifiesDataCustomCleanMultiform, OuterMultiForm, ThreadedErrorMultiForm,
+    ThreadedMultiForm, UserSearchForm, BulkBadgeMultiForm,
+    BulkManyToManyMultiForm, BulkBookMultiForm, UserSortForm,
+    BulkSpecialBadgeMultiForm,
 )
 
 
@@ -53,9 +67,27 @@ class MultiFormTest(TestCase):
 
     def test_fields(self):
         form = UserProfileMultiForm()
-        self.assertEqual(form.fields, [
+        self.assertEqual(list(form.fields), [
             'user-name', 'profile-name', 'profile-display_name'
         ])
+        self.assertIs(form.fields['profile-name'], form['profile'].fields['name'])
+
+    def test_fields_and_errors_are_cached(self):
+        form = UserProfileMultiForm({
+            'user-name': 'foo',
+        })
+        self.assertIs(form.fields, form.fields)
+        errors = form.errors
+        self.assertIs(form.errors, errors)
+        self.assertEqual(list(errors), ['profile-name'])
+
+        form.add_crossform_error('Crossform error')
+        self.assertIsNot(form.errors, errors)
+        self.assertEqual(form.errors['__all__'], ['Crossform error'])
+
+        errors = form.errors
+        self.assertFalse(form.is_valid())
+        self.assertIsNot(form.errors, errors)
 
     def test_errors(self):
         form = ErrorMultiForm()
@@ -82,6 +114,32 @@ class MultiFormTest(TestCase):
         profile_p = form['profile'].as_p()
         self.assertEqual(form.as_p(), user_p + profile_p)
 
+    def test_iter_render(self):
+        form = UserProfileMultiForm()
+        self.assertEqual(''.join(form.iter_render()), form.as_table())
+        self.assertEqual(''.join(form.iter_render('as_ul')), form.as_ul())
+        chunks = list(form.iter_render('as_p'))
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual(''.join(chunks), form.as_p())
+
+        form = OuterMultiForm()
+        self.assertEqual(''.join(form.iter_render('as_p')), form.as_p())
+
+    def test_iter_render_streams_formsets(self):
+        form = BookMultiForm({
+            'book-name': '',
+            'images-TOTAL_FORMS': '2',
+            'images-INITIAL_FORMS': '0',
+            'images-0-name': 'One',
+            'images-1-name': 'Two',
+        })
+        form.is_valid()
+        for method in ('as_p', 'as_table', 'as_ul'):
+            chunks = list(form.iter_render(method))
+            # The book form, the management form and the image forms.
+            self.assertEqual(len(chunks), 4)
+            self.assertEqual(''.join(chunks), getattr(form, method)())
+
     def test_is_not_valid(self):
         form = UserProfileMultiForm({
             'user-name': 'foo',
@@ -105,6 +163,43 @@ class MultiFormTest(TestCase):
         self.assertEqual(form.non_field_errors().as_text(),
                          '* It broke\n* It broke')
 
+    def test_validation_executor(self):
+        form = ThreadedMultiForm({
+            'first-name': 'foo',
+            'second-name': 'bar',
+        })
+        self.assertFalse(form.is_valid())
+        self.assertIsNot(form['first'].validation_thread, threading.current_thread())
+        self.assertIsNot(form['second'].validation_thread, threading.current_thread())
+        self.assertEqual(list(form.cleaned_data), ['first', 'second'])
+        self.assertEqual(form.errors['errors-name'], ['This field is required.'])
+
+    def test_validation_executor_closes_connections(self):
+        data = {'first-name': 'foo', 'second-name': 'bar'}
+        with mock.patch('betterforms.multiform.connections.close_all') as close_all:
+            self.assertFalse(ThreadedMultiForm(data).is_valid())
+        self.assertEqual(close_all.call_count, 3)
+
+        class InlineExecutor(Executor):
+            def submit(self, fn, *args):
+                future = Future()
+                future.set_result(fn(*args))
+                return future
+
+        form = ThreadedMultiForm(data)
+        form.validation_executor = InlineExecutor()
+        with mock.patch('betterforms.multiform.connections.close_all') as close_all:
+            self.assertFalse(form.is_valid())
+        # The connections of the request's thread are kept.
+        self.assertFalse(close_all.called)
+
+    def test_validation_executor_collects_all_errors(self):
+        form = ThreadedErrorMultiForm(data={})
+
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.non_field_errors().as_text(),
+                         '* It broke\n* It broke')
+
     def test_is_multipart(self):
         form1 = ErrorMultiForm()
         self.assertFalse(form1.is_multipart())
@@ -163,6 +258,94 @@ class MultiFormTest(TestCase):
             }),
         ]))
 
+    def test_cleaned_data_does_not_revalidate(self):
+        form = UserProfileMultiForm({
+            'user-name': 'foo',
+            'profile-name': 'foo',
+        })
+        with mock.patch.object(form['user'], 'is_valid', wraps=form['user'].is_valid) as is_valid:
+            self.assertTrue(form.is_valid())
+            form.cleaned_data
+            form.cleaned_data
+        self.assertEqual(is_valid.call_count, 1)
+        self.assertIs(form.cleaned_data['user'], form['user'].cleaned_data)
+
+    async def test_ais_valid(self):
+        form = UserProfileMultiForm({
+            'user-name': 'foo',
+        })
+        self.assertFalse(await form.ais_valid())
+        self.assertEqual(list(form.errors), ['profile-name'])
+
+        form = UserProfileMultiForm({
+            'user-name': 'foo',
+            'profile-name': 'foo',
+        })
+        self.assertTrue(await form.ais_valid())
+        self.assertEqual(list(form.cleaned_data), ['user', 'profile'])
+
+    async def test_ais_valid_custom_clean_errors(self):
+        form = RaisesErrorCustomCleanMultiform({
+            'user-name': 'foo',
+            'profile-name': 'foo',
+        })
+        self.assertFalse(await form.ais_valid())
+        self.assertEqual(form.non_field_errors().as_text(), '* It broke')
+
+    async def test_ais_valid_multiform_in_multiform(self):
+        form = OuterMultiForm({})
+        self.assertTrue(await form.ais_valid())
+        self.assertEqual(form['foo4'].cleaned_data, OrderedDict([('foo3', {})]))
+
+    def test_child_form_validated_signal(self):
+        calls = []
+
+        def receiver(sender, multiform, key, form, duration, is_valid, **kwargs):
+            calls.append((sender, multiform, key, form, is_valid))
+            self.assertGreaterEqual(duration, 0)
+
+        child_form_validated.connect(receiver, sender=UserProfileMultiForm)
+        try:
+            form = UserProfileMultiForm({'user-name': 'foo'})
+            self.assertFalse(form.is_valid())
+            # Other MultiForm classes don't send it to the receiver.
+            ThreadedMultiForm({}).is_valid()
+        finally:
+            child_form_validated.disconnect(receiver, sender=UserProfileMultiForm)
+
+        self.assertEqual(calls, [
+            (UserProfileMultiForm, form, 'user', form['user'], True),
+            (UserProfileMultiForm, form, 'profile', form['profile'], False),
+        ])
+
+    def test_child_form_validated_signal_with_executor(self):
+        keys = []
+
+        def receiver(sender, key, **kwargs):
+            keys.append(key)
+
+        child_form_validated.connect(receiver, sender=ThreadedMultiForm)
+        try:
+            ThreadedMultiForm({}).is_valid()
+        finally:
+            child_form_validated.disconnect(receiver, sender=ThreadedMultiForm)
+
+        self.assertEqual(sorted(keys), ['errors', 'first', 'second'])
+
+    async def test_child_form_validated_signal_async(self):
+        keys = []
+
+        def receiver(sender, key, is_valid, **kwargs):
+            keys.append((key, is_valid))
+
+        child_form_validated.connect(receiver, sender=UserProfileMultiForm)
+        try:
+            await UserProfileMultiForm({'user-name': 'foo'}).ais_valid()
+        finally:
+            child_form_validated.disconnect(receiver, sender=UserProfileMultiForm)
+
+        self.assertEqual(keys, [('user', True), ('profile', False)])
+
     def test_handles_none_initial_value(self):
         # Used to throw an AttributeError
         UserProfileMultiForm(initial=None)
@@ -246,6 +429,20 @@ class MultiModelFormTest(TestCase):
         self.assertEqual(objects['badge1'], Badge.objects.get(name='foo'))
         self.assertEqual(objects['badge2'], Badge.objects.get(name='bar'))
 
+    async def test_asave(self):
+        form = BadgeMultiForm({
+            'badge1-name': 'foo',
+            'badge1-color': 'blue',
+            'badge2-name': 'bar',
+            'badge2-color': 'purple',
+        })
+
+        self.assertTrue(await form.ais_valid())
+        objects = await form.asave()
+        self.assertEqual(list(objects), ['badge1', 'badge2'])
+        self.assertEqual(objects['badge1'], await Badge.objects.aget(name='foo'))
+        self.assertEqual(objects['badge2'], await Badge.objects.aget(name='bar'))
+
     def test_save_m2m(self):
         book1 = Book.objects.create(name='Foo')
         Book.objects.create(name='Bar')
@@ -269,6 +466,120 @@ class MultiModelFormTest(TestCase):
         form.save_m2m()
         self.assertEqual(objects['author'].books.get(), book1)
 
+    def test_bulk_save(self):
+        form = BulkBadgeMultiForm({
+            'badge1-name': 'foo',
+            'badge1-color': 'blue',
+            'badge2-name': 'bar',
+            'badge2-color': 'purple',
+        })
+        self.assertTrue(form.is_valid())
+
+        # One INSERT for both badges, the rest are savepoint queries.
+        with self.assertNumQueries(3):
+            objects = form.save()
+        self.assertEqual(objects['badge1'], Badge.objects.get(name='foo'))
+        self.assertEqual(objects['badge2'], Badge.objects.get(name='bar'))
+
+    def test_bulk_save_updates(self):
+        badge1 = Badge.objects.create(name='foo', color='blue')
+        badge2 = Badge.objects.create(name='bar', color='purple')
+        form = BulkBadgeMultiForm({
+            'badge1-name': 'foo',
+            'badge1-color': 'red',
+            'badge2-name': 'baz',
+            'badge2-color': 'purple',
+        }, instance={'badge1': badge1, 'badge2': badge2})
+        self.assertTrue(form.is_valid())
+
+        with self.assertNumQueries(3):
+            form.save()
+        self.assertEqual(Badge.objects.get(pk=badge1.pk).color, 'red')
+        self.assertEqual(Badge.objects.get(pk=badge2.pk).name, 'baz')
+
+    def test_bulk_save_multi_table_inheritance(self):
+        form = BulkSpecialBadgeMultiForm({
+            'badge-name': 'foo',
+            'badge-color': 'blue',
+            'special-name': 'bar',
+            'special-color': 'purple',
+            'special-level': 'gold',
+        })
+        self.assertTrue(form.is_valid())
+
+        objects = form.save()
+        self.assertEqual(objects['badge'], Badge.objects.get(name='foo'))
+        self.assertEqual(objects['special'], SpecialBadge.objects.get(name='bar', level='gold'))
+
+        form = BulkSpecialBadgeMultiForm({
+            'badge-name': 'foo',
+            'badge-color': 'blue',
+            'special-name': 'baz',
+            'special-color': 'purple',
+            'special-level': 'silver',
+        }, instance={'badge': objects['badge'], 'special': objects['special']})
+        self.assertTrue(form.is_valid())
+        form.save()
+        self.assertEqual(SpecialBadge.objects.get().level, 'silver')
+        self.assertEqual(Badge.objects.get(pk=objects['special'].pk).name, 'baz')
+
+    async def test_asave_bulk(self):
+        form = BulkBadgeMultiForm({
+            'badge1-name': 'foo',
+            'badge1-color': 'blue',
+            'badge2-name': 'bar',
+            'badge2-color': 'purple',
+        })
+        self.assertTrue(await form.ais_valid())
+        with mock.patch.object(BulkBadgeMultiForm, 'save_bulk', autospec=True, side_effect=BulkBadgeMultiForm.save_bulk) as save_bulk:
+            objects = await form.asave()
+        save_bulk.assert_called_once_with(form)
+        self.assertEqual(objects['badge1'], await Badge.objects.aget(name='foo'))
+        self.assertEqual(objects['badge2'], await Badge.objects.aget(name='bar'))
+
+    def test_bulk_save_m2m(self):
+        book1 = Book.objects.create(name='Foo')
+        book2 = Book.objects.create(name='Bar')
+        Book.objects.create(name='Baz')
+
+        form = BulkManyToManyMultiForm({
+            'badge-name': 'badge name',
+            'badge-color': 'badge color',
+            'author-name': 'author name',
+            'author-books': [book1.pk, book2.pk],
+        })
+        self.assertTrue(form.is_valid())
+
+        objects = form.save()
+        self.assertEqual(set(objects['author'].books.all()), {book1, book2})
+        self.assertEqual(objects['badge'], Badge.objects.get())
+
+    def test_bulk_save_with_formset(self):
+        book = Book.objects.create(name='Book')
+        existing = BookImage.objects.create(book=book, name='Existing')
+        removed = BookImage.objects.create(book=book, name='Removed')
+        form = BulkBookMultiForm({
+            'book-name': 'Renamed',
+            'images-0-id': existing.pk,
+            'images-0-name': 'Changed',
+            'images-1-id': removed.pk,
+            'images-1-name': 'Removed',
+            'images-1-DELETE': 'on',
+            'images-2-name': 'One',
+            'images-3-name': 'Two',
+            'images-TOTAL_FORMS': '4',
+            'images-INITIAL_FORMS': '2',
+            'images-MAX_NUM_FORMS': '1000',
+        }, instance=book)
+        self.assertTrue(form.is_valid())
+
+        form.save()
+        self.assertEqual(Book.objects.get().name, 'Renamed')
+        self.assertEqual(
+            sorted(book.images.values_list('name', flat=True)),
+            ['Changed', 'One', 'Two'],
+        )
+
     def test_instance(self):
         user = User(name='foo')
         profile = Profile(display_name='bar')
@@ -357,3 +668,163 @@ class MultiModelFormTest(TestCase):
         })
         # assertDoesntRaise AttributeError
         self.assertEqual(form.non_field_errors().as_text(), '* It broke')
+
+
+class BrowseViewTest(TestCase):
+    def test_keyset_pagination(self):
+        for name in ('c', 'a', 'b'):
+            User.objects.create(name=name)
+        view = BrowseView.as_view(
+            form_class=UserSortForm,
+            model=User,
+            template_name='noop.html',
+            paginate_by=2,
+            keyset_pagination=True,
+        )
+
+        response = view(RequestFactory().get('/', {'sorts': '1'}))
+        page = response.context_data['page_obj']
+        self.assertTrue(response.context_data['is_paginated'])
+        self.assertEqual([user.name for user in response.context_data['object_list']], ['a', 'b'])
+        self.assertTrue(page.has_next())
+        self.assertFalse(page.has_previous())
+
+        response = view(RequestFactory().get('/?' + page.next_querystring))
+        page = response.context_data['page_obj']
+        self.assertEqual([user.name for user in response.context_data['object_list']], ['c'])
+        self.assertFalse(page.has_next())
+        self.assertTrue(page.has_previous())
+
+        with self.assertRaises(Http404):
+            view(RequestFactory().get('/', {'sorts': '1', 'cursor': 'invalid'}))
+
+    def get_paginated_view(self, **kwargs):
+        return BrowseView.as_view(
+            form_class=UserSortForm,
+            model=User,
+            template_name='noop.html',
+            paginate_by=2,
+            **kwargs
+        )
+
+    def test_cached_count(self):
+        for name in ('c', 'a', 'b'):
+            User.objects.create(name=name)
+        cache.clear()
+        view = self.get_paginated_view(count_strategy='cached')
+
+        response = view(RequestFactory().get('/', {'sorts': '1'}))
+        self.assertEqual(response.context_data['paginator'].count, 3)
+        # The second page reuses the count of the first one, even though
+        # the count went stale.
+        User.objects.create(name='d')
+        with self.assertNumQueries(1):
+            response = view(RequestFactory().get('/', {'sorts': '1', 'page': '2'}))
+            self.assertEqual(response.context_data['paginator'].count, 3)
+            self.assertEqual([user.name for user in response.context_data['page_obj']], ['c'])
+
+    def test_estimated_count_falls_back_to_exact(self):
+        for name in ('c', 'a', 'b'):
+            User.objects.create(name=name)
+        view = self.get_paginated_view(count_strategy='estimate', count_estimate_threshold=0)
+
+        response = view(RequestFactory().get('/', {'sorts': '1'}))
+        self.assertEqual(response.context_data['paginator'].count, 3)
+
+    def test_has_next_count(self):
+        for name in ('c', 'a', 'b'):
+            User.objects.create(name=name)
+        view = self.get_paginated_view(count_strategy='has_next')
+
+        with self.assertNumQueries(1):
+            response = view(RequestFactory().get('/', {'sorts': '1'}))
+            page = response.context_data['page_obj']
+            self.assertEqual([user.name for user in page], ['a', 'b'])
+        self.assertIsNone(response.context_data['paginator'].count)
+        self.assertTrue(page.has_next())
+        self.assertFalse(page.has_previous())
+        self.assertEqual((page.start_index(), page.end_index()), (1, 2))
+
+        response = view(RequestFactory().get('/', {'sorts': '1', 'page': '2'}))
+        page = response.context_data['page_obj']
+        self.assertEqual([user.name for user in page], ['c'])
+        self.assertFalse(page.has_next())
+        self.assertTrue(page.has_previous())
+
+        with self.assertRaises(Http404):
+            view(RequestFactory().get('/', {'sorts': '1', 'page': '3'}))
+
+    def test_count_strategies_with_invalid_form(self):
+        User.objects.create(name='a')
+        cache.clear()
+        for count_strategy in ('exact', 'cached', 'estimate', 'has_next'):
+            view = self.get_paginated_view(count_strategy=count_strategy)
+            response = view(RequestFactory().get('/', {'sorts': '99'}))
+            self.assertFalse(response.context_data['form'].is_valid())
+            self.assertEqual(list(response.context_data['object_list']), [])
+
+    def test_cached_count_of_empty_filter(self):
+        cache.clear()
+        paginator = CachedCountPaginator(User.objects.filter(pk__in=[]).order_by('pk'), 2)
+        self.assertEqual(paginator.count, 0)
+
+    def test_count_cache_key_quotes_params(self):
+        self.assertNotEqual(
+            get_count_cache_key(User.objects.filter(name__in=['a, b'])),
+            get_count_cache_key(User.objects.filter(name__in=['a', 'b'])),
+        )
+
+    def test_unknown_count_strategy(self):
+        view = self.get_paginated_view(count_strategy='foo')
+        with self.assertRaises(ImproperlyConfigured):
+            view(RequestFactory().get('/', {'sorts': '1'}))
+
+
+class AsyncBrowseViewTest(TestCase):
+    async def test_get(self):
+        await User.objects.acreate(name='foo')
+        await User.objects.acreate(name='bar')
+        view = AsyncBrowseView.as_view(
+            form_class=UserSearchForm,
+            model=User,
+            template_name='noop.html',
+        )
+
+        response = await view(RequestFactory().get('/', {'q': 'fo'}))
+        self.assertTrue(response.context_data['form'].is_valid())
+        self.assertEqual(
+            [user.name async for user in response.context_data['object_list']],
+            ['foo'],
+        )
+
+    async def test_form_validated_once(self):
+        calls = []
+
+        class CountingSearchForm(UserSearchForm):
+            def is_valid(self):
+                calls.append('is_valid')
+                return super().is_valid()
+
+        class AsyncCountingSearchForm(UserSearchForm):
+            async def ais_valid(self):
+                calls.append('ais_valid')
+                return await sync_to_async(super().is_valid)()
+
+        for form_class, expected in [
+            (CountingSearchForm, ['is_valid']),
+            (AsyncCountingSearchForm, ['ais_valid']),
+        ]:
+            calls.clear()
+            view = AsyncBrowseView.as_view(
+                form_class=form_class,
+                model=User,
+                template_name='noop.html',
+            )
+            response = await view(RequestFactory().get('/', {'q': 'fo'}))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(calls, expected)
+
+    async def test_post_not_allowed(self):
+        view = AsyncBrowseView.as_view(form_class=UserSearchForm, model=User)
+        response = await view(RequestFactory().post('/'))
+        self.assertEqual(response.status_code, 405)